@@ -5,6 +5,9 @@ Advanced usage patterns and integration examples
 import asyncio
 import json
 from scraper import GoogleMapsScraper
+from planner import plan_campaign
+from result_store import ResultStore
+from progress import setup_logging
 
 
 async def scrape_and_filter_no_website():
@@ -18,10 +21,8 @@ async def scrape_and_filter_no_website():
     all_businesses = await scraper.scrape_google_maps()
 
     # Filter for businesses without websites
-    no_website_businesses = [
-        b for b in all_businesses
-        if not b.get('website')
-    ]
+    no_website_businesses = ResultStore(
+        all_businesses).filter(has_website=False)
 
     print(f"Total found: {len(all_businesses)}")
     print(f"Without websites: {len(no_website_businesses)}")
@@ -37,12 +38,8 @@ async def scrape_by_rating_and_reviews():
     all_businesses = await scraper.scrape_google_maps()
 
     # Filter for high-rated, established businesses
-    quality_businesses = [
-        b for b in all_businesses
-        if (b.get('rating', 0) >= 4.0 and
-            b.get('review_count', 0) >= 10 and
-            not b.get('website'))
-    ]
+    quality_businesses = ResultStore(all_businesses).filter(
+        min_rating=4.0, min_reviews=10, has_website=False)
 
     return quality_businesses
 
@@ -52,23 +49,41 @@ async def scrape_multiple_cities():
     cities = ["New York", "Los Angeles", "Chicago", "Houston", "Phoenix"]
     business_type = "plumbers"
 
-    all_businesses = []
+    # One scraper (and one crawler) for the whole category x city matrix
+    planned = plan_campaign([business_type], cities)
+    print(f"\n🔍 Scraping {business_type} in {len(cities)} cities...")
+
+    scraper = GoogleMapsScraper([q.query for q in planned])
+    all_businesses = await scraper.scrape_google_maps()
 
-    for city in cities:
-        print(f"\n🔍 Scraping {business_type} in {city}...")
-        query = f"{business_type} in {city}"
+    # Add city info to each business
+    cells = {q.query: q for q in planned}
+    for b in all_businesses:
+        cell = cells.get(b.get('query'))
+        if cell:
+            b['city'] = cell.location
+            b['business_type'] = cell.category
 
-        scraper = GoogleMapsScraper([query])
-        businesses = await scraper.scrape_google_maps()
+    return all_businesses
 
-        # Add city info to each business
-        for b in businesses:
-            b['city'] = city
-            b['business_type'] = business_type
 
-        all_businesses.extend(businesses)
+async def top_leads_per_city():
+    """Rank the highest-rated no-website leads in each city"""
+    cities = ["New York", "Los Angeles", "Chicago"]
+    queries = [f"plumbers in {city}" for city in cities]
 
-    return all_businesses
+    scraper = GoogleMapsScraper(queries)
+    store = ResultStore(await scraper.scrape_google_maps())
+
+    # Uses the rating index; stops as soon as every city has 5 leads
+    leads_per_city = store.top_per(5, group_by='city', has_website=False)
+
+    for city, leads in leads_per_city.items():
+        print(f"\n🏙️  {city}")
+        for b in leads:
+            print(f"   {b.get('rating')} ⭐  {b.get('name')}")
+
+    return leads_per_city
 
 
 async def scrape_and_export_to_database_format():
@@ -126,17 +141,13 @@ async def example_landing_page_lead_generation():
     # - No website (need landing page service)
     # - Good ratings (proven business)
     # - Multiple reviews (established)
-    landing_page_candidates = [
-        b for b in all_businesses
-        if (not b.get('website') and
-            b.get('rating', 0) >= 4.0 and
-            b.get('review_count', 0) >= 5)
-    ]
+    store = ResultStore(all_businesses)
+    landing_page_candidates = store.filter(
+        has_website=False, min_rating=4.0, min_reviews=5)
 
     print(f"\n📊 RESULTS:")
     print(f"Total businesses found: {len(all_businesses)}")
-    print(
-        f"Without websites: {len([b for b in all_businesses if not b.get('website')])}")
+    print(f"Without websites: {store.count(has_website=False)}")
     print(f"Perfect landing page leads: {len(landing_page_candidates)}")
 
     # Save results
@@ -179,6 +190,7 @@ async def scrape_with_retries():
 
 
 if __name__ == "__main__":
+    setup_logging()
     # Run the main landing page lead generation example
     asyncio.run(example_landing_page_lead_generation())
 
@@ -186,4 +198,5 @@ if __name__ == "__main__":
     # asyncio.run(scrape_and_filter_no_website())
     # asyncio.run(scrape_by_rating_and_reviews())
     # asyncio.run(scrape_multiple_cities())
+    # asyncio.run(top_leads_per_city())
     # asyncio.run(scrape_and_export_to_database_format())
@@ -0,0 +1,83 @@
+"""
+Benchmark: per-page browser CPU, RSS and time to first listing per launch profile
+Runs real searches, so it needs Playwright browsers, psutil and network access.
+Run from the project root: python -m benchmarks.launch_profiles --pages 5
+"""
+
+import argparse
+import asyncio
+import os
+import time
+
+import psutil
+from playwright.async_api import async_playwright
+
+from browser_profiles import PROFILES
+from memory_watchdog import sample_memory
+from scraper_simple import GoogleMapsScraper
+
+
+DEFAULT_QUERIES = ["plumbers in New York", "electricians in Chicago",
+                   "roofers in Houston", "locksmiths in Phoenix", "dentists in Denver"]
+
+
+def browser_cpu_seconds() -> float:
+    """User + system CPU time of every child process (driver and browser)"""
+    total = 0.0
+    for child in psutil.Process(os.getpid()).children(recursive=True):
+        try:
+            times = child.cpu_times()
+            total += times.user + times.system
+        except psutil.Error:
+            continue
+    return total
+
+
+async def run(profile_name: str, queries: list[str]) -> dict:
+    profile = PROFILES[profile_name]
+    url_of = GoogleMapsScraper()._build_google_maps_url
+    first_listing, cpu, rss = [], [], []
+
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(**profile.launch_options())
+        try:
+            for query in queries:
+                page = await browser.new_page(**profile.context_options())
+                cpu_before = browser_cpu_seconds()
+                start = time.perf_counter()
+                await page.goto(url_of(query), wait_until='domcontentloaded', timeout=30000)
+                await page.wait_for_selector('[role="feed"] > div', timeout=30000)
+                first_listing.append(time.perf_counter() - start)
+                # Let the page settle so CPU and RSS cover the full load
+                await page.wait_for_timeout(3000)
+                cpu.append(browser_cpu_seconds() - cpu_before)
+                rss.append(sample_memory().browser_mb)
+                await page.close()
+        finally:
+            await browser.close()
+
+    count = len(queries)
+    return {
+        'profile': profile_name,
+        'first_listing_s': sum(first_listing) / count,
+        'cpu_s': sum(cpu) / count,
+        'rss_mb': max(rss),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--pages', type=int, default=len(DEFAULT_QUERIES))
+    parser.add_argument('--profiles', nargs='+', default=list(PROFILES))
+    args = parser.parse_args()
+
+    queries = [DEFAULT_QUERIES[i % len(DEFAULT_QUERIES)] for i in range(args.pages)]
+    print(f"{'profile':<8} {'first listing':>14} {'CPU/page':>9} {'peak RSS':>9}")
+    for name in args.profiles:
+        result = asyncio.run(run(name, queries))
+        print(f"{result['profile']:<8} {result['first_listing_s']:>13.2f}s "
+              f"{result['cpu_s']:>8.2f}s {result['rss_mb']:>6.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
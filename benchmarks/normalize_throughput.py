@@ -0,0 +1,65 @@
+"""
+Benchmark: normalization throughput per core
+Run from the project root: python -m benchmarks.normalize_throughput
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import time
+
+from normalize import NormalizationStage, normalize_batch
+
+
+STREETS = ['Main St', 'Oak Ave', 'Broadway', 'Market St', 'Elm Rd']
+CITIES = [('New York', 'NY', '10001'), ('Austin', 'TX', '78701'),
+          ('Chicago', 'IL', '60601'), ('Denver', 'CO', '80202')]
+CATEGORIES = ['Plumber', 'Electrician', 'Hair salon', 'HVAC contractor']
+
+
+def make_businesses(count: int) -> list[dict]:
+    """Synthetic businesses shaped like raw scraper_simple output"""
+    rng = random.Random(42)
+    businesses = []
+    for i in range(count):
+        city, state, zip_code = rng.choice(CITIES)
+        businesses.append({
+            'name': f"Business {i}",
+            'address': f"Address\n{rng.choice(CATEGORIES)} · {rng.randint(1, 999)} "
+                       f"{rng.choice(STREETS)}, {city}, {state} {zip_code}",
+            'phone': f"Phone\n({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(1000, 9999)}",
+        })
+    return businesses
+
+
+async def run_pool(businesses: list[dict], workers: int, batch_size: int) -> float:
+    start = time.perf_counter()
+    async with NormalizationStage(max_workers=workers, batch_size=batch_size) as stage:
+        stage.submit(businesses)
+        await stage.drain()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--records', type=int, default=100_000)
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 1) - 1))
+    args = parser.parse_args()
+
+    businesses = make_businesses(args.records)
+
+    start = time.perf_counter()
+    normalize_batch(businesses)
+    single = time.perf_counter() - start
+    print(f"in-process:   {args.records / single:>10,.0f} records/s (1 core)")
+
+    elapsed = asyncio.run(run_pool(businesses, args.workers, args.batch_size))
+    rate = args.records / elapsed
+    print(f"pool x{args.workers:<3}:    {rate:>10,.0f} records/s "
+          f"({rate / args.workers:,.0f} per core)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: website liveness checks per minute against a local stub server
+Run from the project root: python -m benchmarks.website_check_throughput
+
+The stub serves live, parked, missing, social-redirect, HEAD-refusing and
+hanging sites on many loopback addresses (127.0.0.x), so the per-host cap
+and the classification are exercised without touching the network.
+"""
+
+import argparse
+import asyncio
+import time
+from collections import Counter
+
+from aiohttp import web
+
+from website_check import WebsiteChecker
+
+
+LIVE_PAGE = "<html><head><title>Joe's Plumbing</title></head><body>Call us</body></html>"
+PARKED_PAGE = "<html><body><h1>example.com</h1><p>This domain is for sale!</p></body></html>"
+
+# path -> status the checker should report
+EXPECTED = {
+    '/live': 'live',
+    '/parked': 'parked',
+    '/gone': 'dead',
+    '/social': 'social',
+    '/nohead': 'live',
+    '/hang': 'dead',
+}
+
+
+async def handle(request: web.Request) -> web.StreamResponse:
+    path = request.path
+    if path == '/live':
+        return web.Response(text=LIVE_PAGE, content_type='text/html')
+    if path == '/parked':
+        return web.Response(text=PARKED_PAGE, content_type='text/html')
+    if path == '/social':
+        raise web.HTTPFound('https://www.facebook.com/joesplumbing')
+    if path == '/nohead':
+        if request.method == 'HEAD':
+            raise web.HTTPMethodNotAllowed('HEAD', ['GET'])
+        return web.Response(text=LIVE_PAGE, content_type='text/html')
+    if path == '/hang':
+        # Held until shutdown; the checker's timeout has to give up first
+        await request.app['release'].wait()
+    raise web.HTTPNotFound()
+
+
+async def run(urls: int, hosts: int, concurrency: int, timeout: float, port: int):
+    app = web.Application()
+    app['release'] = asyncio.Event()
+    app.router.add_route('*', '/{tail:.*}', handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, '0.0.0.0', port).start()
+
+    paths = list(EXPECTED)
+    targets = []
+    for i in range(urls):
+        # An even mix of site kinds, plus 1% that never answer
+        path = '/hang' if i % 100 == 99 else paths[i % (len(paths) - 1)]
+        targets.append((f"http://127.0.0.{i % hosts + 1}:{port}{path}?id={i}", path))
+
+    try:
+        async with WebsiteChecker(concurrency=concurrency, timeout=timeout) as checker:
+            start = time.perf_counter()
+            results = await checker.check_many(url for url, _ in targets)
+            elapsed = time.perf_counter() - start
+    finally:
+        app['release'].set()
+        await runner.cleanup()
+
+    counts = Counter(r['status'] for r in results.values())
+    wrong = [(url, path, results[url]['status']) for url, path in targets
+             if results[url]['status'] != EXPECTED[path]]
+    print(f"{urls} URLs on {hosts} hosts in {elapsed:.1f}s "
+          f"-> {urls / elapsed * 60:,.0f} URLs/min")
+    print(f"Statuses: {dict(counts)}; requests: {dict(checker.stats)}")
+    print(f"Misclassified: {len(wrong)}" + (f" (e.g. {wrong[0]})" if wrong else ''))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--urls', type=int, default=5000)
+    parser.add_argument('--hosts', type=int, default=250)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--timeout', type=float, default=2)
+    parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+    asyncio.run(run(args.urls, args.hosts, args.concurrency, args.timeout, args.port))
+
+
+if __name__ == "__main__":
+    main()
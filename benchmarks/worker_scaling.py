@@ -0,0 +1,61 @@
+"""
+Benchmark: throughput scaling of sharded scraping from 1 to N workers
+Runs real scrapes, so it needs Playwright browsers and network access.
+Run from the project root: python -m benchmarks.worker_scaling --max-workers 8
+"""
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from workers import ShardedScrape
+
+
+DEFAULT_QUERIES = [
+    f"{category} in {city}"
+    for category in ["plumbers", "electricians", "roofers", "locksmiths"]
+    for city in ["New York", "Chicago", "Houston", "Phoenix"]
+]
+
+
+async def run(workers: int, queries: list[str], max_results: int) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        sharded = ShardedScrape(
+            workers, location=str(Path(tmp) / 'queue.sqlite'),
+            options={'output_dir': tmp, 'delay': 0})
+        start = time.perf_counter()
+        count = 0
+        async for _ in sharded.stream(queries, max_results):
+            count += 1
+        elapsed = time.perf_counter() - start
+    return {'workers': workers, 'records': count, 'seconds': elapsed}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--max-workers', type=int, default=4)
+    parser.add_argument('--max-results', type=int, default=20)
+    parser.add_argument('--queries', type=Path,
+                        help='File with one query per line')
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        queries = [q.strip() for q in args.queries.read_text().splitlines() if q.strip()]
+
+    baseline = None
+    workers = 1
+    while workers <= args.max_workers:
+        result = asyncio.run(run(workers, queries, args.max_results))
+        qpm = len(queries) / result['seconds'] * 60
+        baseline = baseline or qpm
+        print(f"{workers:>3} workers: {qpm:7.1f} queries/min, "
+              f"{result['records'] / result['seconds']:6.1f} records/s, "
+              f"speedup x{qpm / baseline:.2f}")
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -33,6 +33,9 @@ class ScraperConfig:
     headless: bool = True  # Run browser in headless mode
     proxy_list: Optional[list[str]] = None  # List of proxies to rotate through
     user_agent: Optional[str] = None  # Custom user agent
+    # Browser launch profile: "lean" (headless shell, trimmed flags, small
+    # viewport) or "compat" (full Chromium, desktop viewport)
+    launch_profile: str = "lean"
 
     def __post_init__(self):
         if self.exclude_keywords is None:
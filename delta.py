@@ -0,0 +1,213 @@
+"""
+Delta mode for the Google Maps Scraper
+Emits only businesses that are new or changed since the previous run
+"""
+
+import hashlib
+import json
+import logging
+import re
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Fields recorded per business in the index (scraped_at etc. are ignored)
+TRACKED_FIELDS = ['name', 'rating', 'review_count',
+                  'address', 'phone', 'website']
+
+# Fields that make up a business fingerprint by default; review counts tick
+# up between almost any two runs, so they don't make a business "changed"
+FINGERPRINT_FIELDS = ['name', 'rating', 'address', 'phone', 'website']
+
+CHANGE_NEW = 'new'
+CHANGE_CHANGED = 'changed'
+CHANGE_GONE = 'gone'
+
+INDEX_KEY = 'FINGERPRINT_INDEX'
+
+
+def _normalize_text(value) -> Optional[str]:
+    """Casefold and collapse whitespace so cosmetic edits don't count"""
+    if value is None:
+        return None
+    text = re.sub(r'\s+', ' ', str(value)).strip().casefold()
+    return text or None
+
+
+def _normalize_phone(value) -> Optional[str]:
+    """Keep only the digits (and a leading +) of a phone number"""
+    if not value:
+        return None
+    digits = re.sub(r'[^\d+]', '', str(value))
+    return digits or None
+
+
+def _normalize_website(value) -> Optional[str]:
+    """Drop scheme, www. and trailing slash from a website URL"""
+    text = _normalize_text(value)
+    if not text:
+        return None
+    text = re.sub(r'^https?://', '', text)
+    text = re.sub(r'^www\.', '', text)
+    return text.rstrip('/') or None
+
+
+def normalize_fields(business: dict) -> dict:
+    """Return the normalized fingerprint fields of a business"""
+    return {
+        'name': _normalize_text(business.get('name')),
+        'rating': business.get('rating'),
+        'review_count': business.get('review_count'),
+        'address': _normalize_text(business.get('address')),
+        'phone': _normalize_phone(business.get('phone')),
+        'website': _normalize_website(business.get('website')),
+    }
+
+
+def fingerprint(fields: dict) -> str:
+    """Content hash over normalized fields"""
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+
+def record_key(business: dict) -> str:
+    """
+    Stable identity of a business across runs.
+
+    Uses the place ID when the listing had one, otherwise the normalized
+    name and address.
+    """
+    if business.get('place_id'):
+        return f"place:{business['place_id']}"
+    fields = normalize_fields(business)
+    return f"name:{fields['name']}|{fields['address']}"
+
+
+class DeltaTracker:
+    """Compares scraped businesses against the fingerprint index of earlier runs"""
+
+    def __init__(self, previous_index: Optional[dict] = None, emit_gone: bool = False,
+                 fields: Optional[list[str]] = None):
+        """
+        Initialize the tracker.
+
+        Args:
+            previous_index: Index saved by an earlier run ({key: entry})
+            emit_gone: Also report businesses that disappeared from a query
+            fields: Fingerprint fields (default: FINGERPRINT_FIELDS)
+        """
+        self.previous_index = previous_index or {}
+        self.emit_gone = emit_gone
+        self.fields = list(fields or FINGERPRINT_FIELDS)
+        self.index = dict(self.previous_index)
+        self.seen_keys = set()
+        self.seen_queries = set()
+        self.stats = {CHANGE_NEW: 0, CHANGE_CHANGED: 0,
+                      'unchanged': 0, CHANGE_GONE: 0}
+
+    def classify(self, business: dict) -> Optional[dict]:
+        """
+        Classify a business against the previous run.
+
+        Returns:
+            The business annotated with `change_type` (and `diff` for changed
+            records), or None if it is unchanged
+        """
+        key = record_key(business)
+        fields = normalize_fields(business)
+        digest = fingerprint({field: fields[field] for field in self.fields})
+        query = business.get('query')
+
+        if query:
+            self.seen_queries.add(query)
+        if key in self.seen_keys:
+            return None
+        self.seen_keys.add(key)
+
+        previous = self.previous_index.get(key)
+        self.index[key] = {
+            'fingerprint': digest,
+            'fields': fields,
+            'values': {field: business.get(field) for field in TRACKED_FIELDS},
+            'query': query,
+            'name': business.get('name'),
+            'place_id': business.get('place_id'),
+        }
+
+        if previous is None:
+            self.stats[CHANGE_NEW] += 1
+            return {**business, 'change_type': CHANGE_NEW}
+
+        if previous.get('fingerprint') == digest:
+            self.stats['unchanged'] += 1
+            return None
+
+        diff = {}
+        old_fields = previous.get('fields', {})
+        old_values = previous.get('values', {})
+        for field in self.fields:
+            if old_fields.get(field) != fields[field]:
+                diff[field] = {'old': old_values.get(field),
+                               'new': business.get(field)}
+
+        # Same fingerprint fields, hashed over a different field list
+        # (an index saved with other settings)
+        if not diff:
+            self.stats['unchanged'] += 1
+            return None
+
+        self.stats[CHANGE_CHANGED] += 1
+        return {**business, 'change_type': CHANGE_CHANGED, 'diff': diff}
+
+    def gone(self) -> list[dict]:
+        """
+        Businesses from the previous run that were not seen again.
+
+        Only queries that ran this time are considered, so dropping a query
+        from the input doesn't mark all of its businesses as gone. Gone
+        entries are removed from the index.
+        """
+        gone = []
+        for key, entry in self.previous_index.items():
+            if key in self.seen_keys or entry.get('query') not in self.seen_queries:
+                continue
+            self.index.pop(key, None)
+            self.stats[CHANGE_GONE] += 1
+            if self.emit_gone:
+                # Last known values, so gone records can be filtered like the rest
+                gone.append({
+                    **entry.get('values', {}),
+                    'name': entry.get('name'),
+                    'place_id': entry.get('place_id'),
+                    'query': entry.get('query'),
+                    'change_type': CHANGE_GONE,
+                })
+        return gone
+
+    def apply(self, businesses: list[dict]) -> list[dict]:
+        """Return the new, changed (and optionally gone) records of a run"""
+        results = []
+        for business in businesses:
+            record = self.classify(business)
+            if record is not None:
+                results.append(record)
+        results.extend(self.gone())
+
+        logger.info(
+            f"Delta: {self.stats[CHANGE_NEW]} new, {self.stats[CHANGE_CHANGED]} changed, "
+            f"{self.stats['unchanged']} unchanged, {self.stats[CHANGE_GONE]} gone")
+        return results
+
+    @classmethod
+    async def load(cls, store, emit_gone: bool = False,
+                   fields: Optional[list[str]] = None) -> 'DeltaTracker':
+        """Create a tracker from the index kept in a key-value store"""
+        previous_index = await store.get_value(INDEX_KEY) or {}
+        logger.info(f"Loaded fingerprint index with {len(previous_index)} entries")
+        return cls(previous_index, emit_gone=emit_gone, fields=fields)
+
+    async def save(self, store):
+        """Persist the updated index for the next run"""
+        await store.set_value(INDEX_KEY, self.index)
+        logger.info(f"Saved fingerprint index with {len(self.index)} entries")
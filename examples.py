@@ -4,6 +4,7 @@ Example script showing how to use the Google Maps Scraper
 
 import asyncio
 from scraper import GoogleMapsScraper
+from progress import setup_logging
 
 
 async def example_1_basic_scrape():
@@ -87,4 +88,5 @@ async def run_all_examples():
 
 
 if __name__ == "__main__":
+    setup_logging()
     asyncio.run(run_all_examples())
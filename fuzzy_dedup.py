@@ -0,0 +1,344 @@
+"""
+Fuzzy duplicate detection for scraped businesses
+Finds the same business listed with small name or address variations
+("Joe's Plumbing LLC" vs "Joes Plumbing") using blocking keys - phone,
+postal code and MinHash/LSH buckets over name n-grams - so records are only
+compared within their buckets instead of pairwise; the index can be kept
+in a key-value store so later runs are checked against earlier ones
+"""
+
+import logging
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Iterable, Optional
+
+from delta import record_key
+from normalize import normalize_phone, parse_address
+
+
+logger = logging.getLogger(__name__)
+
+# Legal-form and filler words that don't distinguish businesses
+NAME_STOPWORDS = {
+    'llc', 'inc', 'ltd', 'co', 'corp', 'corporation', 'company', 'the',
+    'and', 'services', 'service', 'gmbh', 'plc', 'pllc', 'lp', 'llp',
+}
+
+MASK_64 = (1 << 64) - 1
+
+ACTION_DROP = 'drop'
+ACTION_MERGE = 'merge'
+ACTION_FLAG = 'flag'
+
+INDEX_KEY = 'DEDUP_INDEX'
+
+
+@dataclass
+class DedupConfig:
+    """Settings for fuzzy duplicate detection"""
+
+    # Score at or above which two records are the same business (0-1)
+    match_threshold: float = 0.8
+    # What to do with a duplicate: "drop" it, "merge" its missing fields
+    # into the kept record, or "flag" it with duplicate_of and keep it
+    action: str = ACTION_MERGE
+    # Signal weights for the score (only signals both records have count)
+    name_weight: float = 0.6
+    phone_weight: float = 0.25
+    address_weight: float = 0.15
+    # MinHash/LSH: num_perm = bands * rows; more rows -> stricter buckets
+    lsh_bands: int = 6
+    lsh_rows: int = 3
+    ngram_size: int = 3
+    # Stop comparing against a bucket once it holds this many records
+    max_bucket_size: int = 25
+    # Region for parsing national-format phones
+    default_region: str = 'US'
+
+    def __post_init__(self):
+        if self.action not in (ACTION_DROP, ACTION_MERGE, ACTION_FLAG):
+            raise ValueError(
+                f"Unknown dedup action '{self.action}' (use drop, merge or flag)")
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Casefold, drop punctuation/apostrophes and legal-form words"""
+    if not name:
+        return ''
+    text = name.casefold().replace("'", '').replace('’', '')
+    words = re.findall(r'\w+', text)
+    return ' '.join(w for w in words if w not in NAME_STOPWORDS)
+
+
+def ngrams(text: str, size: int = 3) -> set[str]:
+    """Character n-grams of a string (padded so short names still shingle)"""
+    if not text:
+        return set()
+    padded = f" {text} "
+    if len(padded) <= size:
+        return {padded}
+    return {padded[i:i + size] for i in range(len(padded) - size + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+class MinHasher:
+    """MinHash signatures with deterministic permutations (stable across runs)"""
+
+    def __init__(self, num_perm: int, seed: int = 1):
+        # Multiply-shift hash family; a simple LCG picks the (odd) multipliers
+        # so the permutations don't depend on the random module
+        self.permutations = []
+        state = seed
+        for _ in range(num_perm):
+            state = (state * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+            a = state | 1
+            state = (state * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+            self.permutations.append((a, state))
+
+    def signature(self, shingles: set[str]) -> list[int]:
+        hashes = [zlib.crc32(s.encode('utf-8')) for s in shingles]
+        return [min(((a * h + b) & MASK_64) >> 32 for h in hashes)
+                for a, b in self.permutations]
+
+
+class FuzzyDeduplicator:
+    """
+    Streaming fuzzy dedup: call process() for each record as it arrives.
+
+    Every kept record is indexed under its blocking keys. A new record is
+    scored only against the records sharing at least one bucket with it,
+    so the work per record is bounded by the bucket sizes, not the history.
+
+    Records kept by earlier runs (the history) are indexed too, as compact
+    rows whose features are rebuilt only when a bucket brings them up. A
+    business seen again under the same record key is not a duplicate of
+    itself; a different listing matching it is one, but since it was
+    delivered by an earlier run there is nothing to merge into, so it is
+    dropped (or flagged).
+    """
+
+    def __init__(self, config: Optional[DedupConfig] = None, history: Optional[list] = None):
+        """
+        Initialize the deduplicator.
+
+        Args:
+            config: Dedup settings
+            history: Rows saved by an earlier run (see rows())
+        """
+        self.config = config or DedupConfig()
+        self.minhasher = MinHasher(self.config.lsh_bands * self.config.lsh_rows)
+        self.kept = []
+        self.features = []
+        self.row_keys = []
+        self.buckets = {}
+        self.history = history or []
+        self.stats = {'records': 0, 'duplicates': 0, 'comparisons': 0,
+                      'history_duplicates': 0}
+        # History rows come first: row ids below len(self.history)
+        for row_id, row in enumerate(self.history):
+            self.kept.append(None)
+            self.features.append(None)
+            self.row_keys.append(row[-1])
+            self._index(row_id, row[-1])
+
+    def _row_features(self, row_id: int) -> dict:
+        """Features of a kept record, rebuilt from its saved row for history"""
+        features = self.features[row_id]
+        if features is not None:
+            return features
+        key, display_name, phone, postal_code, street, place_id, _ = self.history[row_id]
+        name = normalize_name(display_name)
+        return {
+            'key': key,
+            'name': name,
+            'name_grams': ngrams(name, self.config.ngram_size),
+            'phone': phone,
+            'postal_code': postal_code,
+            'street': street,
+            'street_grams': ngrams(street, self.config.ngram_size) if street else set(),
+            'place_id': place_id,
+        }
+
+    def _features(self, business: dict) -> dict:
+        address_parts = business.get('address_parts') or parse_address(
+            business.get('address'), self.config.default_region)
+        name = normalize_name(business.get('name'))
+        phone = business.get('phone_e164') or normalize_phone(
+            business.get('phone'), address_parts.get('country') or self.config.default_region)
+        street = (address_parts.get('street') or '').casefold()
+        return {
+            'key': record_key(business),
+            'name': name,
+            'name_grams': ngrams(name, self.config.ngram_size),
+            'phone': phone,
+            'postal_code': (address_parts.get('postal_code') or '').replace(' ', '').upper() or None,
+            'street': street,
+            'street_grams': ngrams(street, self.config.ngram_size) if street else set(),
+            'place_id': business.get('place_id'),
+        }
+
+    def _blocking_keys(self, features: dict) -> list[str]:
+        keys = []
+        if features['phone']:
+            keys.append(f"phone:{features['phone']}")
+        if features['postal_code'] and features['name']:
+            # Postal code alone makes huge buckets; pair it with a name prefix
+            keys.append(f"zip:{features['postal_code']}:{features['name'][:3]}")
+        if features['name_grams']:
+            signature = self.minhasher.signature(features['name_grams'])
+            rows = self.config.lsh_rows
+            for band in range(self.config.lsh_bands):
+                chunk = signature[band * rows:(band + 1) * rows]
+                # Stable across processes, so saved keys stay valid
+                digest = zlib.crc32(','.join(map(str, chunk)).encode('ascii'))
+                keys.append(f"lsh:{band}:{digest:08x}")
+        return keys
+
+    def _index(self, row_id: int, keys: list[str]):
+        for key in keys:
+            bucket = self.buckets.setdefault(key, [])
+            if len(bucket) < self.config.max_bucket_size:
+                bucket.append(row_id)
+
+    def score(self, a: dict, b: dict) -> float:
+        """Similarity of two feature sets (0-1) over the signals both have"""
+        if a['place_id'] and b['place_id']:
+            # Distinct place IDs are distinct places (e.g. two branches)
+            return 1.0 if a['place_id'] == b['place_id'] else 0.0
+
+        config = self.config
+        total = config.name_weight * jaccard(a['name_grams'], b['name_grams'])
+        weight = config.name_weight
+        if a['phone'] and b['phone']:
+            total += config.phone_weight * (1.0 if a['phone'] == b['phone'] else 0.0)
+            weight += config.phone_weight
+        if a['street_grams'] and b['street_grams']:
+            address_sim = jaccard(a['street_grams'], b['street_grams'])
+            if a['postal_code'] and b['postal_code'] and a['postal_code'] != b['postal_code']:
+                address_sim = 0.0
+            total += config.address_weight * address_sim
+            weight += config.address_weight
+        return total / weight
+
+    def find_duplicate(self, features: dict, keys: list[str]) -> Optional[tuple[int, float]]:
+        """Best-scoring kept record sharing a bucket, if it clears the threshold"""
+        candidates = set()
+        for key in keys:
+            candidates.update(self.buckets.get(key, ()))
+
+        config = self.config
+        total_weight = config.name_weight + config.phone_weight + config.address_weight
+        best = None
+        # Newest first, so a tie goes to this run's record (which can be merged into)
+        for row_id in sorted(candidates, reverse=True):
+            other = self._row_features(row_id)
+            if row_id < len(self.history) and other['key'] == features['key']:
+                # The same business as in an earlier run, not a duplicate
+                continue
+            self.stats['comparisons'] += 1
+            if not (features['place_id'] and other['place_id']):
+                # Cheap bound: even perfect phone and address matches can't
+                # lift a weak name match over the threshold
+                name_sim = jaccard(features['name_grams'], other['name_grams'])
+                bound = (config.name_weight * name_sim + config.phone_weight
+                         + config.address_weight) / total_weight
+                if bound < config.match_threshold:
+                    continue
+            similarity = self.score(features, other)
+            if similarity >= self.config.match_threshold and (best is None or similarity > best[1]):
+                best = (row_id, similarity)
+        return best
+
+    def process(self, business: dict) -> Optional[dict]:
+        """
+        Check one record against everything kept so far.
+
+        Returns:
+            The record to emit, or None when it was dropped or merged into an
+            earlier record (merging fills the earlier record's missing fields
+            in place)
+        """
+        self.stats['records'] += 1
+        features = self._features(business)
+        keys = self._blocking_keys(features)
+        match = self.find_duplicate(features, keys)
+
+        if match is not None:
+            row_id, similarity = match
+            self.stats['duplicates'] += 1
+            if row_id < len(self.history):
+                self.stats['history_duplicates'] += 1
+                _, name, _, _, _, place_id, _ = self.history[row_id]
+                logger.debug(f"Duplicate of an earlier run ({similarity:.2f}): "
+                             f"{business.get('name')!r} ~ {name!r}")
+                if self.config.action == ACTION_FLAG:
+                    return {**business, 'duplicate_of': place_id or name,
+                            'duplicate_score': round(similarity, 3)}
+                return None
+
+            kept = self.kept[row_id]
+            logger.debug(f"Duplicate ({similarity:.2f}): {business.get('name')!r} "
+                         f"~ {kept.get('name')!r}")
+
+            if self.config.action == ACTION_DROP:
+                return None
+            if self.config.action == ACTION_MERGE:
+                for field, value in business.items():
+                    if value not in (None, '', []) and kept.get(field) in (None, '', []):
+                        kept[field] = value
+                return None
+            return {**business, 'duplicate_of': kept.get('place_id') or kept.get('name'),
+                    'duplicate_score': round(similarity, 3)}
+
+        row_id = len(self.kept)
+        self.kept.append(business)
+        self.features.append(features)
+        self.row_keys.append(keys)
+        self._index(row_id, keys)
+        return business
+
+    def apply(self, businesses: Iterable[dict]) -> list[dict]:
+        """Deduplicate a batch of records, keeping the first of each business"""
+        results = []
+        for business in businesses:
+            record = self.process(business)
+            if record is not None:
+                results.append(record)
+        logger.info(f"Fuzzy dedup: {self.stats['duplicates']} duplicates in "
+                    f"{self.stats['records']} records ({self.stats['history_duplicates']} "
+                    f"of earlier runs, {self.stats['comparisons']} comparisons)")
+        return results
+
+    def rows(self) -> list[list]:
+        """
+        Compact rows of every kept record, history included, for the next run:
+        [record key, name, phone, postal code, street, place_id, blocking keys].
+        A business kept again this run replaces its history row.
+        """
+        rows = {}
+        for row in self.history:
+            rows[row[0]] = row
+        for row_id in range(len(self.history), len(self.kept)):
+            f = self.features[row_id]
+            rows[f['key']] = [f['key'], self.kept[row_id].get('name'), f['phone'],
+                              f['postal_code'], f['street'], f['place_id'], self.row_keys[row_id]]
+        return list(rows.values())
+
+    @classmethod
+    async def load(cls, store, config: Optional[DedupConfig] = None) -> 'FuzzyDeduplicator':
+        """Create a deduplicator from the index kept in a key-value store"""
+        history = await store.get_value(INDEX_KEY) or []
+        logger.info(f"Loaded dedup index with {len(history)} businesses")
+        return cls(config, history=history)
+
+    async def save(self, store):
+        """Persist the index, this run's records included, for the next run"""
+        rows = self.rows()
+        await store.set_value(INDEX_KEY, rows)
+        logger.info(f"Saved dedup index with {len(rows)} businesses")
@@ -0,0 +1,167 @@
+"""
+HAR record-and-replay for the Google Maps Scraper
+Record mode saves each query's network traffic as a compact HAR archive;
+replay mode serves those archives to the unchanged extraction code with no
+network access, so selector fixes can be back-applied without re-crawling
+
+Re-extract everything in an archive directory:
+    python har_archive.py ./output/archives
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import re
+import sys
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from planner import normalize_query
+
+
+logger = logging.getLogger(__name__)
+
+MODE_RECORD = 'record'
+MODE_REPLAY = 'replay'
+
+MANIFEST = 'manifest.json'
+
+# What archive_name() produces; anything else in a downloaded manifest is
+# rejected, so a crafted name can't write outside the archive directory
+ARCHIVE_NAME = re.compile(r'^[a-z0-9-]*[0-9a-f]{10}\.har\.zip$')
+
+
+def archive_name(query: str) -> str:
+    """File name of a query's archive: readable slug plus a hash of the query"""
+    canonical = normalize_query(query).casefold()
+    slug = re.sub(r'[^a-z0-9]+', '-', canonical).strip('-')[:60]
+    digest = hashlib.sha1(canonical.encode('utf-8')).hexdigest()[:10]
+    return f"{slug}-{digest}.har.zip"
+
+
+class QueryArchive:
+    """
+    Per-query HAR archives in a directory, with a manifest of the queries.
+
+    Archives are zipped HARs with response bodies attached as separate
+    entries, which keeps them several times smaller than embedded HARs.
+    """
+
+    def __init__(self, directory: str, mode: str):
+        """
+        Initialize the archive.
+
+        Args:
+            directory: Where archives and the manifest live
+            mode: "record" or "replay"
+        """
+        if mode not in (MODE_RECORD, MODE_REPLAY):
+            raise ValueError(f"Unknown archive mode '{mode}' (use record or replay)")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.mode = mode
+        self.manifest_path = self.directory / MANIFEST
+        self.manifest = {}
+        if self.manifest_path.exists():
+            self.manifest = json.loads(self.manifest_path.read_text(encoding='utf-8'))
+
+    @property
+    def replaying(self) -> bool:
+        return self.mode == MODE_REPLAY
+
+    def queries(self) -> list[dict]:
+        """Recorded queries as {query, max_results, recorded_at} entries"""
+        return list(self.manifest.values())
+
+    @asynccontextmanager
+    async def page(self, browser, query: str, max_results: int, **context_options):
+        """
+        A page in its own browser context that records to, or replays from,
+        the query's archive. Recording is flushed when the context closes.
+        `context_options` are passed on to browser.new_context().
+        """
+        name = archive_name(query)
+        path = self.directory / name
+
+        if self.replaying:
+            if not path.exists():
+                raise FileNotFoundError(f"No archive for '{query}' ({path})")
+            context = await browser.new_context(service_workers='block', **context_options)
+            # Anything not in the archive is aborted: replay never hits the network
+            await context.route_from_har(path, not_found='abort')
+        else:
+            context = await browser.new_context(
+                service_workers='block',
+                record_har_path=path,
+                record_har_content='attach',
+                record_har_mode='minimal',
+                **context_options,
+            )
+
+        try:
+            yield await context.new_page()
+        finally:
+            await context.close()
+
+        if not self.replaying:
+            self.manifest[name] = {
+                'query': query,
+                'max_results': max_results,
+                'recorded_at': datetime.now().isoformat(),
+            }
+            self.manifest_path.write_text(json.dumps(self.manifest, indent=2), encoding='utf-8')
+
+    async def upload(self, store):
+        """Copy the manifest and all archives to a key-value store"""
+        for name in self.manifest:
+            path = self.directory / name
+            if path.exists():
+                await store.set_value(name, path.read_bytes(),
+                                      content_type='application/zip')
+        await store.set_value('manifest', self.manifest)
+        logger.info(f"Uploaded {len(self.manifest)} archives")
+
+    async def download(self, store):
+        """Fetch the manifest and all archives from a key-value store"""
+        manifest = await store.get_value('manifest') or {}
+        self.manifest = {}
+        for name, entry in manifest.items():
+            if not ARCHIVE_NAME.match(name):
+                logger.warning(f"Skipping archive with an invalid name: {name!r}")
+                continue
+            self.manifest[name] = entry
+        for name in self.manifest:
+            data = await store.get_value(name)
+            if data:
+                (self.directory / name).write_bytes(data)
+        self.manifest_path.write_text(json.dumps(self.manifest, indent=2), encoding='utf-8')
+        logger.info(f"Downloaded {len(self.manifest)} archives")
+
+
+async def replay_all(directory: str, output_file: Optional[str] = None) -> list[dict]:
+    """Re-extract every recorded query in a directory with the current selectors"""
+    from scraper_simple import GoogleMapsScraper
+
+    archive = QueryArchive(directory, MODE_REPLAY)
+    scraper = GoogleMapsScraper(archive=archive)
+    entries = archive.queries()
+    async with scraper.browser_session():
+        for entry in entries:
+            await scraper.scrape_query(entry['query'], entry.get('max_results', 20))
+
+    print(f"Re-extracted {len(scraper.businesses)} businesses from {len(entries)} archives")
+    if output_file:
+        print(f"Saved to {scraper.save_results(output_file)}")
+    return scraper.businesses
+
+
+if __name__ == "__main__":
+    from progress import setup_logging
+    setup_logging()
+    if len(sys.argv) < 2:
+        print("Usage: python har_archive.py <archive_dir> [output.json]")
+        sys.exit(1)
+    asyncio.run(replay_all(sys.argv[1], sys.argv[2] if len(sys.argv) > 2 else None))
@@ -6,18 +6,116 @@ Runs as an Apify Actor on the Apify platform
 import asyncio
 import json
 import logging
+import time
 from datetime import datetime
+from typing import Optional
 from apify import Actor
 from scraper_simple import GoogleMapsScraper
+from delta import FINGERPRINT_FIELDS, DeltaTracker
+from normalize import NormalizationStage
+from memory_watchdog import MemoryWatchdog, actor_memory_limit_mb
+from workers import ShardedScrape
+from fuzzy_dedup import DedupConfig, FuzzyDeduplicator
+from query_cache import QueryCache
+from har_archive import MODE_REPLAY, QueryArchive
+from profiling import RunProfiler
+from result_store import ResultStore
+from reviews import parse_since
+from sqlite_export import LeadDatabase
+from progress import ProgressReporter, setup_logging
+from planner import (BudgetedScheduler, actor_deadline, compute_units_to_seconds,
+                     parse_template, plan_campaign)
 
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging (queued, so log I/O stays off the scraping loop)
+setup_logging()
 logger = logging.getLogger(__name__)
 
+# Key of the SQLite lead database in its key-value store
+LEADS_DB_KEY = 'LEADS_DB'
+
+
+async def scrape_all(scraper: GoogleMapsScraper, queries: list[str], max_results: int,
+                     workers: int = 1, queue_backend: str = 'sqlite',
+                     page_recycle_navigations: int = 20, scheduler=None, on_results=None):
+    """
+    Scrape all queries in this process, or shard them over worker processes.
+
+    Args:
+        scheduler: BudgetedScheduler for a campaign run (single process only)
+
+    Returns:
+        Campaign or sharding stats, or None for a plain single-process run
+    """
+    if workers <= 1:
+        if scheduler:
+            return await scheduler.run(scraper, on_results=on_results)
+        await scraper.scrape_multiple(queries, max_per_query=max_results, on_results=on_results)
+        return None
+
+    if scheduler:
+        logger.warning("Campaign budgets are only enforced with a single worker; "
+                       "sharding all planned queries in priority order")
+
+    # Each worker runs its own browser, so each gets a share of the memory
+    memory_limit = actor_memory_limit_mb()
+    sharded = ShardedScrape(
+        workers,
+        backend=queue_backend,
+        location=None if queue_backend == 'apify' else str(
+            scraper.output_dir / 'queue.sqlite'),
+        options={
+            'memory_mb': memory_limit // workers if memory_limit else None,
+            'max_navigations': page_recycle_navigations,
+            'output_dir': str(scraper.output_dir),
+            'launch_profile': scraper.profile.name,
+        },
+    )
+    async for business in sharded.stream(queries, max_results, on_results=on_results):
+        scraper.businesses.append(business)
+    return sharded.stats
+
+
+async def push_reviews(scraper: GoogleMapsScraper, businesses: list[dict], dataset_name: str,
+                       max_reviews: int = 50, since: Optional[datetime] = None,
+                       batch_size: int = 50):
+    """
+    Stream reviews of each business into a separate dataset, linked by
+    place_id. Reviews are pushed in small batches as they are read, so
+    only one batch is held in memory at a time.
+    """
+    dataset = await Actor.open_dataset(name=dataset_name)
+    total = 0
+
+    async with scraper.browser_session():
+        for business in businesses:
+            batch, count = [], 0
+            async for review in scraper.stream_reviews(business, max_reviews, since):
+                batch.append(review)
+                count += 1
+                if len(batch) >= batch_size:
+                    await dataset.push_data(batch)
+                    batch = []
+            if batch:
+                await dataset.push_data(batch)
+            business['reviews_scraped'] = count
+            total += count
+
+    logger.info(f"Pushed {total} reviews of {len(businesses)} businesses to '{dataset_name}'")
+
+
+def campaign_deadline(time_budget_secs=None, compute_unit_budget=None):
+    """Earliest of the time budget, the compute-unit budget and the run timeout"""
+    started = time.time()
+    deadlines = [actor_deadline()]
+    if time_budget_secs:
+        deadlines.append(started + time_budget_secs)
+    if compute_unit_budget:
+        memory_mb = actor_memory_limit_mb() or 1024
+        deadlines.append(started + compute_units_to_seconds(compute_unit_budget, memory_mb))
+    deadlines = [d for d in deadlines if d]
+    return min(deadlines) if deadlines else None
+
 
 async def main():
     """Main entry point for the Apify Actor"""
@@ -27,54 +125,238 @@ async def main():
         actor_input = await Actor.get_input() or {}
 
         # Extract parameters with defaults
-        search_queries = actor_input.get(
-            'searchQueries', ['plumbers in New York'])
+        search_queries = actor_input.get('searchQueries') or []
+        categories = actor_input.get('categories') or []
+        locations = actor_input.get('locations') or []
+        # Checked up front, so a bad template fails the run before any scraping
+        query_template = parse_template(actor_input.get('queryTemplate'))
+        max_total_results = actor_input.get('maxTotalResults')
+        time_budget_secs = actor_input.get('timeBudgetSecs')
+        compute_unit_budget = actor_input.get('computeUnitBudget')
         max_results = actor_input.get('maxResultsPerQuery', 20)
         filter_no_website = actor_input.get('filterNoWebsite', True)
         min_rating = actor_input.get('minRating')
         min_review_count = actor_input.get('minReviewCount')
+        normalize_records = actor_input.get('normalizeRecords', False)
+        default_region = actor_input.get('defaultRegion', 'US')
+        page_recycle_navigations = actor_input.get(
+            'pageRecycleNavigations', 20)
+        launch_profile = actor_input.get('launchProfile', 'lean')
+        profile = actor_input.get('profile', False)
+        profile_page_sample_rate = actor_input.get('profilePageSampleRate', 0.1)
+        profile_tracing = actor_input.get('profileTracing', False)
+        workers = actor_input.get('workers', 1)
+        queue_backend = actor_input.get('queueBackend', 'sqlite')
+        fuzzy_dedup = actor_input.get('fuzzyDedup', False)
+        dedup_action = actor_input.get('dedupAction', 'merge')
+        dedup_threshold = actor_input.get('dedupThreshold', 0.8)
+        dedup_history = actor_input.get('dedupHistory', False)
+        dedup_store_name = actor_input.get('dedupStoreName', 'google-maps-dedup')
+        use_query_cache = actor_input.get('useQueryCache', False)
+        cache_ttl_hours = actor_input.get('cacheTtlHours', 12)
+        cache_store_name = actor_input.get(
+            'cacheStoreName', 'google-maps-query-cache')
+        scrape_reviews = actor_input.get('scrapeReviews', False)
+        max_reviews_per_place = actor_input.get('maxReviewsPerPlace', 50)
+        # Parsed up front, so a bad date fails the run before any scraping
+        reviews_since = parse_since(actor_input.get('reviewsSince'))
+        reviews_dataset_name = actor_input.get(
+            'reviewsDatasetName', 'google-maps-reviews')
+        verify_websites = actor_input.get('verifyWebsites', False)
+        website_check_concurrency = actor_input.get('websiteCheckConcurrency', 200)
+        website_check_timeout = actor_input.get('websiteCheckTimeoutSecs', 8)
+        archive_mode = actor_input.get('archiveMode', 'off')
+        archive_store_name = actor_input.get(
+            'archiveStoreName', 'google-maps-archives')
+        export_sqlite = actor_input.get('exportSqlite', False)
+        sqlite_store_name = actor_input.get('sqliteStoreName', 'google-maps-leads')
+        delta_mode = actor_input.get('deltaMode', False)
+        emit_gone = actor_input.get('emitGone', False)
+        delta_review_counts = actor_input.get('deltaTrackReviewCount', False)
+        delta_store_name = actor_input.get(
+            'deltaStoreName', 'google-maps-delta')
+
+        # Expand a category x location matrix into a budgeted campaign
+        scheduler = None
+        if categories and locations:
+            planned = plan_campaign(categories, locations, query_template)
+            search_queries = [q.query for q in planned]
+            scheduler = BudgetedScheduler(
+                planned,
+                max_per_query=max_results,
+                max_total_results=max_total_results,
+                deadline=campaign_deadline(time_budget_secs, compute_unit_budget),
+            )
+
+        # Record each query's traffic, or re-extract from recorded traffic
+        archive = None
+        if archive_mode != 'off':
+            archive = QueryArchive('./output/archives', archive_mode)
+            archive_store = await Actor.open_key_value_store(name=archive_store_name)
+            if archive.replaying:
+                await archive.download(archive_store)
+                if not search_queries:
+                    search_queries = [entry['query'] for entry in archive.queries()]
+                    max_results = max([entry.get('max_results', max_results)
+                                       for entry in archive.queries()], default=max_results)
+
+        if not search_queries:
+            search_queries = ['plumbers in New York']
+
+        # Workers scrape with their own scrapers, which don't record or replay
+        if archive and workers > 1:
+            logger.warning(f"Archive mode '{archive_mode}' needs a single worker; "
+                           f"running with 1 worker instead of {workers}")
+            workers = 1
 
         logger.info(f"Starting Google Maps scraper")
         logger.info(f"Queries: {search_queries}")
         logger.info(f"Max results per query: {max_results}")
 
+        # Workers scrape with their own scrapers and don't see the cache;
+        # the task queue already runs each distinct query only once
+        if use_query_cache and workers > 1:
+            logger.warning("The query cache isn't used with more than one worker; disabling it")
+            use_query_cache = False
+
         # Initialize scraper
-        scraper = GoogleMapsScraper()
+        watchdog = MemoryWatchdog(max_navigations=page_recycle_navigations)
+        # Without the persistent cache, duplicate queries are still coalesced
+        # (a replay must re-extract, so it never reads the cache)
+        if use_query_cache and archive_mode != MODE_REPLAY:
+            cache = await QueryCache.open(cache_store_name, ttl_hours=cache_ttl_hours)
+        else:
+            cache = QueryCache()
+        # Opt-in profiling of the whole pipeline (a no-op when disabled)
+        profiler = RunProfiler(enabled=profile, page_sample_rate=profile_page_sample_rate,
+                               trace_pages=profile_tracing)
+        profiler.start()
+        # Sampled progress lines, mirrored to the Actor status message
+        progress = ProgressReporter(status_callback=Actor.set_status_message)
+        scraper = GoogleMapsScraper(watchdog=watchdog, cache=cache, archive=archive,
+                                    launch_profile=launch_profile, profiler=profiler,
+                                    progress=progress)
 
-        # Run scraping
+        # Run scraping, normalizing each query's results in a process pool
+        # while the next query is being scraped
+        scrape_options = {
+            'scheduler': scheduler,
+            'workers': workers,
+            'queue_backend': queue_backend,
+            'page_recycle_navigations': page_recycle_navigations,
+        }
         try:
-            await scraper.scrape_multiple(search_queries, max_per_query=max_results)
+            with profiler.phase('scrape'):
+                if normalize_records:
+                    async with NormalizationStage(default_region=default_region) as stage:
+                        scrape_stats = await scrape_all(
+                            scraper, search_queries, max_results, on_results=stage.submit,
+                            **scrape_options)
+                        scraper.businesses = await stage.drain()
+                else:
+                    scrape_stats = await scrape_all(
+                        scraper, search_queries, max_results, **scrape_options)
             logger.info(f"Scraped {len(scraper.businesses)} businesses total")
         except Exception as e:
             logger.error(f"Error during scraping: {e}")
             raise
 
-        # Apply filters
-        results = scraper.businesses
+        if archive and not archive.replaying:
+            await archive.upload(archive_store)
 
-        if filter_no_website:
-            results = scraper.filter_no_website()
-            logger.info(
-                f"Filtered to {len(results)} businesses without websites")
+        # Collapse the same business listed with small name/address variations
+        dedup = None
+        if fuzzy_dedup:
+            dedup_config = DedupConfig(
+                match_threshold=dedup_threshold,
+                action=dedup_action,
+                default_region=default_region,
+            )
+            # With history, also against businesses kept by earlier runs
+            if dedup_history:
+                dedup_store = await Actor.open_key_value_store(name=dedup_store_name)
+                dedup = await FuzzyDeduplicator.load(dedup_store, dedup_config)
+            else:
+                dedup = FuzzyDeduplicator(dedup_config)
+            with profiler.phase('dedup'):
+                scraper.businesses = dedup.apply(scraper.businesses)
 
-        if min_rating:
-            results = [b for b in results if (
-                b.get('rating') or 0) >= min_rating]
-            logger.info(
-                f"Filtered to {len(results)} businesses with rating >= {min_rating}")
+        # Dead, parked and social-only websites count as no website
+        website_stats = None
+        if verify_websites:
+            with profiler.phase('website_check'):
+                website_stats = await scraper.verify_websites(
+                    concurrency=website_check_concurrency, timeout=website_check_timeout)
 
-        if min_review_count:
-            results = [b for b in results if (
-                b.get('review_count') or 0) >= min_review_count]
-            logger.info(
-                f"Filtered to {len(results)} businesses with {min_review_count}+ reviews")
+        # Apply filters (resolved against the indexed result store)
+        filters = {
+            'has_website': False if filter_no_website else None,
+            'min_rating': min_rating or None,
+            'min_reviews': min_review_count or None,
+        }
+        with profiler.phase('filter'):
+            results = scraper.results.filter(**filters)
+        logger.info(
+            f"Filtered to {len(results)} businesses (no website only: {filter_no_website}, "
+            f"min rating: {min_rating}, min reviews: {min_review_count})")
+
+        # Read recent reviews of the leads into their own dataset
+        if scrape_reviews:
+            with profiler.phase('reviews'):
+                await push_reviews(scraper, results, reviews_dataset_name,
+                                   max_reviews_per_place, reviews_since)
+
+        # The lead database gets every returned business, so unchanged ones
+        # still refresh last_seen in delta mode
+        leads = results
+
+        # Keep only new/changed businesses since the previous run. The index
+        # covers every scraped business and the filters apply to the changes,
+        # so changing the filters between runs doesn't flap businesses
+        # between gone and new
+        delta = None
+        if delta_mode:
+            delta_store = await Actor.open_key_value_store(name=delta_store_name)
+            delta_fields = FINGERPRINT_FIELDS + (['review_count'] if delta_review_counts else [])
+            delta = await DeltaTracker.load(delta_store, emit_gone=emit_gone, fields=delta_fields)
+            with profiler.phase('delta'):
+                results = ResultStore(delta.apply(scraper.businesses)).filter(**filters)
+
+        # Merge into the lead database kept in a named key-value store
+        lead_db = None
+        if export_sqlite:
+            lead_store = await Actor.open_key_value_store(name=sqlite_store_name)
+            lead_db_path = scraper.output_dir / 'leads.sqlite'
+            existing = await lead_store.get_value(LEADS_DB_KEY)
+            if existing:
+                # A WAL left next to a replaced database file would corrupt it
+                for suffix in ('-wal', '-shm'):
+                    lead_db_path.with_name(lead_db_path.name + suffix).unlink(missing_ok=True)
+                lead_db_path.write_bytes(existing)
+            lead_db = LeadDatabase(str(lead_db_path))
 
         # Push results to Apify dataset
-        for business in results:
-            await Actor.push_data(business)
+        with profiler.phase('push'):
+            for business in results:
+                await Actor.push_data(business)
+            if lead_db:
+                lead_db.add(leads)
 
         logger.info(f"✅ Pushed {len(results)} businesses to dataset")
 
+        if lead_db:
+            lead_count = lead_db.count()
+            lead_db.close()
+            await lead_store.set_value(LEADS_DB_KEY, lead_db_path.read_bytes(),
+                                       content_type='application/vnd.sqlite3')
+            logger.info(f"Lead database: {lead_count} businesses in '{sqlite_store_name}'")
+
+        # Only advance the indexes once the changes have been delivered
+        if delta:
+            await delta.save(delta_store)
+        if dedup and dedup_history:
+            await dedup.save(dedup_store)
+
         # Store summary in key-value store
         summary = {
             'total_scraped': len(scraper.businesses),
@@ -82,6 +364,30 @@ async def main():
             'queries': search_queries,
             'scraped_at': datetime.now().isoformat(),
         }
+        summary['launch_profile'] = scraper.profile.name
+        summary['memory'] = watchdog.stats
+        summary['page_loads'] = scraper.page_loads
+        if scraper.duplicates:
+            summary['duplicates'] = scraper.duplicates
+        if workers <= 1 and (cache.stats['hits'] or cache.stats['coalesced'] or use_query_cache):
+            summary['cache'] = cache.stats
+            logger.info(f"Query cache: {cache.stats['hits']} hits, {cache.stats['coalesced']} "
+                        f"coalesced duplicates, {cache.stats['pages_saved']} pages saved")
+        if scrape_stats:
+            summary['campaign' if scheduler and workers <= 1 else 'sharding'] = scrape_stats
+        if dedup:
+            summary['fuzzy_dedup'] = dedup.stats
+        if website_stats is not None:
+            summary['website_check'] = website_stats
+        if lead_db:
+            summary['lead_database'] = {'written': lead_db.stats['written'],
+                                        'total': lead_count}
+        if delta:
+            summary['delta'] = delta.stats
+        if profile:
+            profiler.stop()
+            summary['profile'] = profiler.summary()['phases']
+            await profiler.save(await Actor.open_key_value_store())
         await Actor.set_value('summary', summary)
 
         logger.info(f"Actor execution completed successfully!")
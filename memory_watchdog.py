@@ -0,0 +1,182 @@
+"""
+Memory watchdog for long scraping runs
+Samples Python and browser process RSS against the Actor memory limit and
+decides when pages or the whole browser should be recycled
+"""
+
+import logging
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+logger = logging.getLogger(__name__)
+
+# Environment variables the Apify platform sets with the run's memory (MB)
+MEMORY_ENV_VARS = ['ACTOR_MEMORY_MBYTES', 'APIFY_MEMORY_MBYTES']
+
+
+def actor_memory_limit_mb() -> Optional[int]:
+    """Memory limit of the current Actor run, or None when running locally"""
+    for name in MEMORY_ENV_VARS:
+        value = os.environ.get(name)
+        if value and value.isdigit():
+            return int(value)
+    return None
+
+
+def _proc_rss_mb(pid: int) -> float:
+    """RSS of a single process from /proc (Linux fallback without psutil)"""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0.0
+
+
+def _proc_children(pid: int) -> list[int]:
+    """All descendants of a process from /proc (Linux fallback without psutil)"""
+    parents = {}
+    for entry in Path('/proc').iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            # Field 4 of /proc/<pid>/stat is the parent pid; the command name
+            # in field 2 may contain spaces, so split after its closing paren
+            stat = (entry / 'stat').read_text()
+            parents[int(entry.name)] = int(stat.rsplit(')', 1)[1].split()[1])
+        except (OSError, ValueError, IndexError):
+            continue
+
+    children, frontier = [], [pid]
+    while frontier:
+        parent = frontier.pop()
+        for child, child_parent in parents.items():
+            if child_parent == parent:
+                children.append(child)
+                frontier.append(child)
+    return children
+
+
+@dataclass
+class MemorySample:
+    """RSS snapshot in megabytes"""
+
+    python_mb: float
+    browser_mb: float
+
+    @property
+    def total_mb(self) -> float:
+        return self.python_mb + self.browser_mb
+
+
+def sample_memory() -> MemorySample:
+    """
+    RSS of this Python process and of all its child processes.
+
+    Playwright's driver and every Chromium process are descendants of the
+    Python process, so the children's RSS is the browser's footprint.
+    """
+    pid = os.getpid()
+    if psutil is not None:
+        process = psutil.Process(pid)
+        browser = 0
+        for child in process.children(recursive=True):
+            try:
+                browser += child.memory_info().rss
+            except psutil.Error:
+                continue
+        return MemorySample(process.memory_info().rss / 2**20, browser / 2**20)
+
+    return MemorySample(_proc_rss_mb(pid),
+                        sum(_proc_rss_mb(child) for child in _proc_children(pid)))
+
+
+class MemoryWatchdog:
+    """Decides when to recycle the scraping page or restart the browser"""
+
+    def __init__(self, limit_mb: Optional[int] = None, max_navigations: int = 20,
+                 page_recycle_ratio: float = 0.6, browser_restart_ratio: float = 0.8,
+                 min_recovered_mb: float = 50.0):
+        """
+        Initialize the watchdog.
+
+        Args:
+            limit_mb: Memory limit (default: the Actor's configured memory)
+            max_navigations: Recycle a page after this many navigations
+            page_recycle_ratio: Recycle the page once the browser's RSS passes
+                this fraction of the limit
+            browser_restart_ratio: Drain and restart the browser once its
+                RSS passes this fraction of the limit
+            min_recovered_mb: A browser restart that recovers less than this
+                isn't repeated until the browser grows by as much again
+        """
+        self.limit_mb = limit_mb or actor_memory_limit_mb()
+        self.max_navigations = max_navigations
+        self.page_recycle_ratio = page_recycle_ratio
+        self.browser_restart_ratio = browser_restart_ratio
+        self.min_recovered_mb = min_recovered_mb
+        # Browser RSS right after a restart that recovered next to nothing
+        self._futile_restart_mb = None
+        self.stats = {'page_recycles': 0, 'browser_restarts': 0,
+                      'recovered_mb': 0.0, 'peak_mb': 0.0}
+
+        if self.limit_mb:
+            logger.info(f"Memory watchdog: limit {self.limit_mb} MB, page recycle every "
+                        f"{max_navigations} navigations or above "
+                        f"{self.limit_mb * page_recycle_ratio:.0f} MB browser RSS, "
+                        f"browser restart above {self.limit_mb * browser_restart_ratio:.0f} MB browser RSS")
+        else:
+            logger.info(f"Memory watchdog: no memory limit set, page recycle every "
+                        f"{max_navigations} navigations")
+
+    def sample(self) -> MemorySample:
+        """Take an RSS sample and track the peak"""
+        sample = sample_memory()
+        self.stats['peak_mb'] = max(self.stats['peak_mb'], sample.total_mb)
+        return sample
+
+    def should_restart_browser(self, sample: MemorySample) -> bool:
+        """
+        Whether the browser's RSS is close enough to the limit to restart it.
+
+        Python's own RSS doesn't count, since a browser restart can't give
+        it back, and after a restart that recovered next to nothing the
+        browser has to grow by min_recovered_mb before the next one.
+        """
+        if not self.limit_mb:
+            return False
+        if sample.browser_mb < self.limit_mb * self.browser_restart_ratio:
+            return False
+        if self._futile_restart_mb is not None:
+            return sample.browser_mb >= self._futile_restart_mb + self.min_recovered_mb
+        return True
+
+    def should_recycle_page(self, sample: MemorySample, navigations: int) -> bool:
+        """Whether the page has been used too often or the browser grew too large"""
+        if navigations >= self.max_navigations:
+            return True
+        if not self.limit_mb:
+            return False
+        return sample.browser_mb >= self.limit_mb * self.page_recycle_ratio
+
+    def record_recycle(self, kind: str, before: MemorySample, after: MemorySample):
+        """Log a page recycle or browser restart with the memory it recovered"""
+        recovered = max(before.total_mb - after.total_mb, 0.0)
+        self.stats['recovered_mb'] += recovered
+        if kind == 'browser':
+            self.stats['browser_restarts'] += 1
+            futile = before.browser_mb - after.browser_mb < self.min_recovered_mb
+            self._futile_restart_mb = after.browser_mb if futile else None
+        else:
+            self.stats['page_recycles'] += 1
+        logger.info(f"Recycled {kind}: {before.total_mb:.0f} MB -> {after.total_mb:.0f} MB "
+                    f"(recovered {recovered:.0f} MB, browser {after.browser_mb:.0f} MB)")
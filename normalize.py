@@ -0,0 +1,269 @@
+"""
+Post-processing stage for scraped businesses
+Normalizes phones to E.164, parses addresses and splits categories, in a
+process pool when there are spare cores so CPU-bound parsing doesn't
+compete with the scraping event loop
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+try:
+    import phonenumbers
+except ImportError:
+    phonenumbers = None
+
+
+logger = logging.getLogger(__name__)
+
+# Calling codes for the regions we scrape most; others need phonenumbers
+CALLING_CODES = {
+    'US': '1', 'CA': '1', 'GB': '44', 'IE': '353', 'AU': '61', 'NZ': '64',
+    'DE': '49', 'FR': '33', 'ES': '34', 'IT': '39', 'NL': '31', 'IN': '91',
+}
+
+COUNTRY_NAMES = {
+    'united states': 'US', 'usa': 'US', 'canada': 'CA', 'united kingdom': 'GB',
+    'uk': 'GB', 'ireland': 'IE', 'australia': 'AU', 'new zealand': 'NZ',
+    'germany': 'DE', 'france': 'FR', 'spain': 'ES', 'italy': 'IT',
+    'netherlands': 'NL', 'india': 'IN',
+}
+
+US_STATES = {
+    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'DC', 'FL', 'GA', 'HI',
+    'ID', 'IL', 'IN', 'IA', 'KS', 'KY', 'LA', 'ME', 'MD', 'MA', 'MI', 'MN',
+    'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ', 'NM', 'NY', 'NC', 'ND', 'OH',
+    'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT', 'VA', 'WA',
+    'WV', 'WI', 'WY',
+}
+
+CA_PROVINCES = {'AB', 'BC', 'MB', 'NB', 'NL',
+                'NS', 'NT', 'NU', 'ON', 'PE', 'QC', 'SK', 'YT'}
+
+LABEL_PREFIX = re.compile(r'^(?:address|phone)\s*[:\n]\s*', re.IGNORECASE)
+REGION_POSTAL_US = re.compile(r'^([A-Z]{2})\s+(\d{5}(?:-\d{4})?)$')
+REGION_POSTAL_CA = re.compile(r'^([A-Z]{2})\s+([A-Z]\d[A-Z]\s?\d[A-Z]\d)$')
+POSTAL_UK = re.compile(
+    r'^(.*?)\s*([A-Z]{1,2}\d[A-Z\d]?\s?\d[A-Z]{2})$', re.IGNORECASE)
+POSTAL_PREFIX = re.compile(r'^(\d{4,5})\s+(.+)$')
+# "12345 Elm Road" is a house number and street, not a postal code and city
+STREET_SUFFIX = re.compile(
+    r'\b(?:st|street|rd|road|ave|avenue|blvd|boulevard|ln|lane|dr|drive|way|ct|court|'
+    r'pl|place|hwy|highway|pkwy|parkway|sq|square|ter|terrace|cir|circle)\.?$',
+    re.IGNORECASE)
+CATEGORY_SEPARATOR = re.compile(r'\s*[·•]\s*')
+# Only list separators: "&", "/" and "and" are part of names like
+# "Heating & Air Conditioning" or "Bed and breakfast"
+CATEGORY_SPLIT = re.compile(r'\s*[,·•]\s*')
+# Trailing extension ("ext. 12", "x12", "extension 12"), not part of the number
+PHONE_EXTENSION = re.compile(r'\s*(?:ext\.?|extension|x)\s*\d+\s*$', re.IGNORECASE)
+
+
+def _strip_label(value: Optional[str]) -> Optional[str]:
+    """Remove the 'Address'/'Phone' label and collapse whitespace"""
+    if not value:
+        return None
+    text = LABEL_PREFIX.sub('', value.strip())
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text or None
+
+
+def normalize_phone(raw: Optional[str], default_region: str = 'US') -> Optional[str]:
+    """
+    Convert a raw phone string to E.164.
+
+    Args:
+        raw: Phone text as scraped (may include a "Phone" label)
+        default_region: ISO country code used for national-format numbers
+
+    Returns:
+        E.164 number (e.g. "+12125551234") or None if it can't be parsed
+    """
+    text = _strip_label(raw)
+    if not text:
+        return None
+
+    if phonenumbers is not None:
+        try:
+            number = phonenumbers.parse(text, default_region)
+            if phonenumbers.is_possible_number(number):
+                return phonenumbers.format_number(
+                    number, phonenumbers.PhoneNumberFormat.E164)
+        except phonenumbers.NumberParseException:
+            pass
+        return None
+
+    digits = re.sub(r'\D', '', PHONE_EXTENSION.sub('', text))
+    if text.startswith('+'):
+        return f"+{digits}" if 8 <= len(digits) <= 15 else None
+    if text.startswith('00'):
+        digits = digits[2:]
+        return f"+{digits}" if 8 <= len(digits) <= 15 else None
+
+    code = CALLING_CODES.get(default_region.upper())
+    if not code:
+        return None
+    if code == '1':
+        if len(digits) == 11 and digits.startswith('1'):
+            digits = digits[1:]
+        return f"+1{digits}" if len(digits) == 10 else None
+    digits = digits.lstrip('0')
+    return f"+{code}{digits}" if 6 <= len(digits) <= 12 else None
+
+
+def parse_address(raw: Optional[str], default_country: str = 'US') -> dict:
+    """
+    Parse a one-line address into its parts.
+
+    Handles the common "street, city, REGION POSTAL[, country]" layout and
+    "street, POSTAL city[, country]" as used in most of Europe. A leading
+    "Category · " prefix from the listing card is split off as well.
+
+    Returns:
+        Dict with category, street, city, region, postal_code and country
+        (missing parts are None)
+    """
+    parts = {'category': None, 'street': None, 'city': None,
+             'region': None, 'postal_code': None, 'country': None}
+    text = _strip_label(raw)
+    if not text:
+        return parts
+
+    pieces = CATEGORY_SEPARATOR.split(text)
+    if len(pieces) > 1:
+        parts['category'] = pieces[0] or None
+        text = pieces[-1]
+
+    segments = [s.strip() for s in text.split(',') if s.strip()]
+    if not segments:
+        return parts
+
+    country = COUNTRY_NAMES.get(segments[-1].lower())
+    if country and len(segments) > 1:
+        segments.pop()
+
+    last = segments[-1]
+    match = REGION_POSTAL_US.match(last)
+    if match and match.group(1) in US_STATES:
+        parts['region'], parts['postal_code'] = match.groups()
+        country = country or 'US'
+        segments.pop()
+    elif (match := REGION_POSTAL_CA.match(last)) and match.group(1) in CA_PROVINCES:
+        parts['region'], parts['postal_code'] = match.groups()
+        country = country or 'CA'
+        segments.pop()
+    elif (len(segments) > 1 and (match := POSTAL_PREFIX.match(last))
+          and not STREET_SUFFIX.search(match.group(2))):
+        parts['postal_code'], parts['city'] = match.groups()
+        segments.pop()
+    elif (match := POSTAL_UK.match(last)) and any(c.isdigit() for c in match.group(2)):
+        city, parts['postal_code'] = match.groups()
+        parts['postal_code'] = parts['postal_code'].upper()
+        parts['city'] = city or None
+        country = country or 'GB'
+        segments.pop()
+
+    if parts['city'] is None and len(segments) > 1:
+        parts['city'] = segments.pop()
+    if segments:
+        parts['street'] = ', '.join(segments)
+    parts['country'] = country or default_country
+    return parts
+
+
+def split_categories(raw: Optional[str]) -> list[str]:
+    """Split a category string like "Plumber, Water heater installation" into a list"""
+    if not raw:
+        return []
+    return [c for c in CATEGORY_SPLIT.split(raw.strip()) if c]
+
+
+def normalize_business(business: dict, default_region: str = 'US') -> dict:
+    """Return a copy of a business with normalized phone, address and categories"""
+    address = parse_address(business.get('address'), default_region)
+    card_category = address.pop('category')
+    category = business.get('category') or card_category
+    return {
+        **business,
+        'phone_e164': normalize_phone(business.get('phone'), address['country'] or default_region),
+        'address_parts': address,
+        'categories': split_categories(category),
+    }
+
+
+def normalize_batch(businesses: list[dict], default_region: str = 'US') -> list[dict]:
+    """Normalize a batch of businesses (runs inside a worker process)"""
+    return [normalize_business(b, default_region) for b in businesses]
+
+
+class NormalizationStage:
+    """
+    Feeds batches of scraped businesses to a process pool.
+
+    Shipping records to a worker and back costs about as much as parsing
+    them, so the pool only pays off with spare cores; with max_workers=0
+    (the default on a single core) batches are normalized in-process.
+
+    Usage:
+        async with NormalizationStage() as stage:
+            stage.submit(businesses)      # called as each query finishes
+            normalized = await stage.drain()
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, batch_size: int = 1000,
+                 default_region: str = 'US'):
+        """
+        Initialize the stage.
+
+        Args:
+            max_workers: Worker processes (default: one per CPU but the one
+                running the event loop; 0 normalizes in-process)
+            batch_size: Businesses sent to a worker per task
+            default_region: ISO country code for national-format phones
+        """
+        if max_workers is None:
+            max_workers = (os.cpu_count() or 1) - 1
+        self.max_workers = max_workers
+        self.batch_size = batch_size
+        self.default_region = default_region
+        self.pool = None
+        self._futures = []
+
+    async def __aenter__(self) -> 'NormalizationStage':
+        if self.max_workers > 0:
+            # Spawned, not forked: the logging listener thread is running and
+            # a forked child could inherit its lock held
+            self.pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                            mp_context=multiprocessing.get_context('spawn'))
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = None
+
+    def submit(self, businesses: list[dict]):
+        """Schedule businesses for normalization without waiting for the result"""
+        loop = asyncio.get_running_loop()
+        for start in range(0, len(businesses), self.batch_size):
+            batch = businesses[start:start + self.batch_size]
+            if self.pool is None:
+                future = loop.create_future()
+                future.set_result(normalize_batch(batch, self.default_region))
+            else:
+                future = loop.run_in_executor(
+                    self.pool, normalize_batch, batch, self.default_region)
+            self._futures.append(future)
+
+    async def drain(self) -> list[dict]:
+        """Wait for all submitted batches and return them in submission order"""
+        batches = await asyncio.gather(*self._futures)
+        self._futures = []
+        normalized = [b for batch in batches for b in batch]
+        logger.info(f"Normalized {len(normalized)} businesses")
+        return normalized
@@ -0,0 +1,233 @@
+"""
+Campaign planner for category x location scraping
+Expands a query matrix, then schedules the queries by priority under a
+total-results budget and a wall-clock / compute-unit budget
+"""
+
+import asyncio
+import logging
+import os
+import re
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Optional, Union
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TEMPLATE = "{category} in {location}"
+
+
+@dataclass
+class PlannedQuery:
+    """One cell of the campaign matrix"""
+
+    query: str
+    category: str
+    location: str
+    priority: float = 1.0
+
+
+def normalize_query(text: str) -> str:
+    """Collapse whitespace and stray punctuation so equivalent queries match"""
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text.strip(' ,;')
+
+
+def parse_template(text: Optional[str]) -> str:
+    """
+    Check a query template such as "{category} near {location}".
+
+    Returns:
+        The template, or DEFAULT_TEMPLATE for an empty value
+
+    Raises:
+        ValueError: The template uses other fields or has unbalanced braces
+    """
+    if not text:
+        return DEFAULT_TEMPLATE
+    try:
+        text.format(category='', location='')
+    except (KeyError, IndexError, AttributeError, ValueError):
+        raise ValueError(f"Invalid query template '{text}' (use {{category}} and "
+                         f"{{location}}, and double literal braces: {{{{ }}}})") from None
+    return text
+
+
+def _entries(items: list[Union[str, dict]], key: str) -> list[tuple[str, float]]:
+    """Accept plain strings or {key: ..., "priority": n} objects"""
+    entries = []
+    for item in items:
+        if isinstance(item, dict):
+            entries.append((normalize_query(item[key]), float(item.get('priority', 1.0))))
+        else:
+            entries.append((normalize_query(item), 1.0))
+    return [(name, priority) for name, priority in entries if name]
+
+
+def plan_campaign(categories: list[Union[str, dict]], locations: list[Union[str, dict]],
+                  template: str = DEFAULT_TEMPLATE) -> list[PlannedQuery]:
+    """
+    Expand categories x locations into queries, highest priority first.
+
+    Args:
+        categories: e.g. ["plumbers", {"category": "roofers", "priority": 2}]
+        locations: e.g. ["New York", {"location": "Austin TX", "priority": 3}]
+        template: Query template with {category} and {location}
+
+    Returns:
+        Unique queries ordered by priority (category x location priority),
+        then matrix order
+    """
+    planned, seen = [], set()
+    for category, category_priority in _entries(categories, 'category'):
+        for location, location_priority in _entries(locations, 'location'):
+            query = normalize_query(template.format(category=category, location=location))
+            if query.casefold() in seen:
+                continue
+            seen.add(query.casefold())
+            planned.append(PlannedQuery(query, category, location,
+                                        category_priority * location_priority))
+
+    # sort() is stable, so equal priorities keep matrix order
+    planned.sort(key=lambda q: -q.priority)
+    logger.info(f"Planned {len(planned)} queries from {len(categories)} categories "
+                f"x {len(locations)} locations")
+    return planned
+
+
+def actor_deadline() -> Optional[float]:
+    """Unix time at which the platform stops the run (ACTOR_TIMEOUT_AT), if set"""
+    value = os.environ.get('ACTOR_TIMEOUT_AT')
+    if not value:
+        return None
+    try:
+        deadline = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if deadline.tzinfo is None:
+        deadline = deadline.replace(tzinfo=timezone.utc)
+    return deadline.timestamp()
+
+
+def compute_units_to_seconds(compute_units: float, memory_mb: int) -> float:
+    """Seconds of run time a compute-unit budget buys (1 CU = 1 GB-hour)"""
+    return compute_units * 3600 / (memory_mb / 1024)
+
+
+class BudgetedScheduler:
+    """
+    Runs planned queries in priority order until a budget runs out.
+
+    Budgets:
+        - max_total_results: stop once this many businesses were collected
+          (the last query is asked for the remainder only)
+        - deadline: wall-clock time (unix seconds) by which scraping must
+          end, leaving `reserve_secs` to write results
+
+    When the remaining time no longer covers the remaining queries, queries
+    whose expected yield (mean results of earlier queries in the same
+    category, else location, else overall) is below `low_yield_ratio` of the
+    overall mean are skipped so the time goes to productive cells.
+    """
+
+    def __init__(self, planned: list[PlannedQuery], max_per_query: int = 20,
+                 max_total_results: Optional[int] = None, deadline: Optional[float] = None,
+                 reserve_secs: float = 60, low_yield_ratio: float = 0.5):
+        self.planned = planned
+        self.max_per_query = max_per_query
+        self.max_total_results = max_total_results
+        self.deadline = deadline
+        self.reserve_secs = reserve_secs
+        self.low_yield_ratio = low_yield_ratio
+        self.yields = []
+        self.durations = []
+        self.stats = {'planned': len(planned), 'run': 0, 'skipped_low_yield': 0,
+                      'not_reached': 0, 'results': 0, 'stop_reason': None}
+
+    def _expected_yield(self, planned: PlannedQuery) -> Optional[float]:
+        for attr in ('category', 'location'):
+            same = [n for q, n in self.yields if getattr(q, attr) == getattr(planned, attr)]
+            if same:
+                return sum(same) / len(same)
+        return self._mean_yield()
+
+    def _mean_yield(self) -> Optional[float]:
+        if not self.yields:
+            return None
+        return sum(n for _, n in self.yields) / len(self.yields)
+
+    def _time_left(self) -> Optional[float]:
+        if self.deadline is None:
+            return None
+        return self.deadline - time.time() - self.reserve_secs
+
+    async def run(self, scraper, on_results: Optional[Callable[[list[dict]], None]] = None,
+                  delay: float = 2) -> dict:
+        """
+        Scrape the planned queries with a scraper_simple.GoogleMapsScraper.
+
+        Businesses are tagged with their category and location and end up in
+        scraper.businesses as usual, so whatever was collected before a
+        budget ran out is still written by the caller.
+        """
+        async with scraper.browser_session():
+            for index, planned in enumerate(self.planned):
+                remaining_results = None
+                if self.max_total_results is not None:
+                    remaining_results = self.max_total_results - self.stats['results']
+                    if remaining_results <= 0:
+                        self.stats['stop_reason'] = 'result budget reached'
+                        break
+
+                time_left = self._time_left()
+                if time_left is not None and self.durations:
+                    avg_duration = sum(self.durations) / len(self.durations)
+                    if time_left < avg_duration:
+                        self.stats['stop_reason'] = 'time budget reached'
+                        break
+                    queries_left = len(self.planned) - index
+                    expected = self._expected_yield(planned)
+                    mean = self._mean_yield()
+                    if (time_left < avg_duration * queries_left and expected is not None
+                            and mean and expected < mean * self.low_yield_ratio):
+                        self.stats['skipped_low_yield'] += 1
+                        logger.info(f"Skipping low-yield query '{planned.query}' "
+                                    f"(expected {expected:.1f} vs mean {mean:.1f}, "
+                                    f"{time_left:.0f}s left)")
+                        continue
+                elif time_left is not None and time_left <= 0:
+                    self.stats['stop_reason'] = 'time budget reached'
+                    break
+
+                max_results = self.max_per_query
+                if remaining_results is not None:
+                    max_results = min(max_results, remaining_results)
+
+                started = time.perf_counter()
+                page_loads = scraper.page_loads
+                businesses = await scraper.scrape_query(planned.query, max_results)
+                loaded = scraper.page_loads > page_loads
+                if loaded:
+                    # Cached queries would skew the time estimate
+                    self.durations.append(time.perf_counter() - started + delay)
+                self.yields.append((planned, len(businesses)))
+                self.stats['run'] += 1
+                self.stats['results'] += len(businesses)
+
+                for business in businesses:
+                    business['category'] = planned.category
+                    business['location'] = planned.location
+                if on_results and businesses:
+                    on_results(businesses)
+                if loaded:
+                    await asyncio.sleep(delay)  # Be respectful with timing
+
+        self.stats['not_reached'] = (self.stats['planned'] - self.stats['run']
+                                     - self.stats['skipped_low_yield'])
+        logger.info(f"Campaign: ran {self.stats['run']}/{self.stats['planned']} queries, "
+                    f"{self.stats['results']} results, {self.stats['skipped_low_yield']} "
+                    f"skipped as low-yield, {self.stats['not_reached']} not reached"
+                    + (f" ({self.stats['stop_reason']})" if self.stats['stop_reason'] else ''))
+        return self.stats
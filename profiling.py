@@ -0,0 +1,240 @@
+"""
+Opt-in deep profiling for scraper runs
+Samples the Python stack on a background thread into folded stacks (ready
+for flamegraph.pl or speedscope), times each pipeline phase, and collects
+CDP performance metrics and optional Chrome traces for a sample of pages,
+all tagged by phase and query
+"""
+
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import asynccontextmanager, contextmanager, nullcontext
+from typing import Optional
+
+
+logger = logging.getLogger(__name__)
+
+# Key-value store keys of the profiling artifacts
+KEY_STACKS = 'PROFILE_STACKS'
+KEY_SUMMARY = 'PROFILE_SUMMARY'
+KEY_TRACE_PREFIX = 'PROFILE_TRACE_'
+
+TRACE_CATEGORIES = ['devtools.timeline', 'v8.execute', 'disabled-by-default-devtools.timeline',
+                    'disabled-by-default-v8.cpu_profiler', 'blink.user_timing', 'loading']
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack at a fixed interval.
+
+    Unlike a tracing profiler this costs the same per sample however many
+    function calls run, so it can stay on for a whole run. Time the event
+    loop spends waiting on the browser shows up under the selector's
+    select() frame.
+    """
+
+    def __init__(self, interval: float = 0.01, thread_id: Optional[int] = None):
+        """
+        Initialize the sampler.
+
+        Args:
+            interval: Seconds between samples
+            thread_id: Thread to sample (default: the calling thread)
+        """
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        # Prefix for the samples taken from now on (phase and query)
+        self.tag = 'run'
+        self.samples = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            if stack:
+                self.samples[(self.tag, tuple(reversed(stack)))] += 1
+
+    def folded(self) -> str:
+        """Samples in folded-stack format: "tag;outer;...;inner count" per line"""
+        lines = []
+        for (tag, stack), count in self.samples.most_common():
+            frames = ';'.join(frame.replace(';', ':') for frame in stack)
+            lines.append(f"{tag};{frames} {count}")
+        return '\n'.join(lines) + '\n'
+
+
+class RunProfiler:
+    """
+    Profiling for a whole run; a disabled profiler does nothing at no cost.
+
+    Usage:
+        profiler = RunProfiler(enabled=True, page_sample_rate=0.2)
+        profiler.start()
+        with profiler.phase('dedup'):
+            ...
+        async with profiler.page(page, query):
+            ...  # navigate and extract
+        profiler.stop()
+        await profiler.save(store)
+    """
+
+    def __init__(self, enabled: bool = True, interval: float = 0.01,
+                 page_sample_rate: float = 0.1, trace_pages: bool = False):
+        """
+        Initialize the profiler.
+
+        Args:
+            enabled: False makes every method a no-op
+            interval: Seconds between Python stack samples
+            page_sample_rate: Fraction of pages to collect CDP metrics for
+            trace_pages: Also record a Chrome trace of each sampled page
+        """
+        self.enabled = enabled
+        self.page_sample_rate = page_sample_rate
+        self.trace_pages = trace_pages
+        self.sampler = StackSampler(interval) if enabled else None
+        self.phase_stack = []
+        self.phase_times = defaultdict(lambda: {'calls': 0, 'seconds': 0.0})
+        self.page_metrics = []
+        self.traces = {}
+        self._pages_seen = 0
+        self._started = None
+
+    def start(self):
+        if self.enabled:
+            self._started = time.perf_counter()
+            self.sampler.start()
+
+    def stop(self):
+        if self.enabled and self._started is not None:
+            self.sampler.stop()
+            self.phase_times['run']['calls'] = 1
+            self.phase_times['run']['seconds'] = time.perf_counter() - self._started
+            self._started = None
+
+    def _tag(self) -> str:
+        if not self.phase_stack:
+            return 'run'
+        path = '/'.join(name for name, _ in self.phase_stack)
+        query = next((q for _, q in reversed(self.phase_stack) if q), None)
+        return f"{path};query={query}" if query else path
+
+    def phase(self, name: str, query: Optional[str] = None):
+        """Context manager that attributes samples and wall time to a phase"""
+        if not self.enabled:
+            return nullcontext()
+        return self._phase(name, query)
+
+    @contextmanager
+    def _phase(self, name: str, query: Optional[str]):
+        self.phase_stack.append((name, query))
+        self.sampler.tag = self._tag()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            timing = self.phase_times['/'.join(n for n, _ in self.phase_stack)]
+            timing['calls'] += 1
+            timing['seconds'] += time.perf_counter() - start
+            self.phase_stack.pop()
+            self.sampler.tag = self._tag()
+
+    def _should_sample_page(self) -> bool:
+        """Deterministic sampling: the 1st page, then every 1/rate-th page"""
+        self._pages_seen += 1
+        if self.page_sample_rate <= 0:
+            return False
+        every = max(1, round(1 / self.page_sample_rate))
+        return (self._pages_seen - 1) % every == 0
+
+    def page(self, page, query: str):
+        """Async context manager that collects browser metrics if the page is sampled"""
+        if not self.enabled or not self._should_sample_page():
+            return nullcontext()
+        return self._page(page, query)
+
+    @asynccontextmanager
+    async def _page(self, page, query: str):
+        phase = self._tag()
+        browser = page.context.browser
+        cdp, tracing = None, False
+        try:
+            cdp = await page.context.new_cdp_session(page)
+            await cdp.send('Performance.enable')
+            if self.trace_pages and browser is not None:
+                await browser.start_tracing(page=page, categories=TRACE_CATEGORIES)
+                tracing = True
+        except Exception as e:
+            logger.debug(f"Couldn't start page profiling: {e}")
+
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            entry = {'query': query, 'phase': phase,
+                     'seconds': round(time.perf_counter() - start, 3), 'metrics': {}}
+            try:
+                if cdp is not None:
+                    result = await cdp.send('Performance.getMetrics')
+                    entry['metrics'] = {m['name']: m['value'] for m in result['metrics']}
+                    await cdp.detach()
+                if tracing:
+                    key = f"{KEY_TRACE_PREFIX}{len(self.traces) + 1}"
+                    self.traces[key] = await browser.stop_tracing()
+                    entry['trace_key'] = key
+            except Exception as e:
+                logger.debug(f"Couldn't collect page profile for '{query}': {e}")
+            self.page_metrics.append(entry)
+
+    def summary(self) -> dict:
+        """Phase timings, per-page browser metrics and the hottest stacks"""
+        samples = self.sampler.samples if self.enabled else Counter()
+        self_time = Counter()
+        for (_, stack), count in samples.items():
+            self_time[stack[-1]] += count
+        total = sum(samples.values()) or 1
+        return {
+            'phases': {name: {'calls': t['calls'], 'seconds': round(t['seconds'], 3)}
+                       for name, t in self.phase_times.items()},
+            'pages': self.page_metrics,
+            'samples': sum(samples.values()),
+            'top_self': [{'frame': frame, 'share': round(count / total, 4)}
+                         for frame, count in self_time.most_common(25)],
+        }
+
+    async def save(self, store):
+        """Write the folded stacks, the summary and any traces to a key-value store"""
+        if not self.enabled:
+            return
+        await store.set_value(KEY_STACKS, self.sampler.folded(), content_type='text/plain')
+        await store.set_value(KEY_SUMMARY, self.summary())
+        for key, trace in self.traces.items():
+            await store.set_value(key, trace, content_type='application/json')
+        logger.info(f"Saved profile: {sum(self.sampler.samples.values())} stack samples, "
+                    f"{len(self.page_metrics)} sampled pages, {len(self.traces)} traces "
+                    f"(flame graph: {KEY_STACKS} into speedscope or flamegraph.pl)")
@@ -0,0 +1,207 @@
+"""
+Logging setup and sampled progress reporting
+Log records go through a queue to a listener thread, so formatting and I/O
+stay off the scraping loop; per-record events are counted instead of
+logged and summarized in rate-limited progress lines
+"""
+
+import asyncio
+import atexit
+import json
+import logging
+import os
+import queue
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Awaitable, Callable, Optional
+
+
+logger = logging.getLogger(__name__)
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# Extra fields rendered by StructuredFormatter when a record carries them
+STRUCTURED_FIELDS = ('query', 'found', 'target', 'failed', 'rate', 'elapsed', 'worker')
+
+_listener = None
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Standard log lines with the record's structured fields appended as
+    key=value pairs, or one JSON object per line.
+    """
+
+    def __init__(self, json_lines: bool = False):
+        super().__init__(LOG_FORMAT)
+        self.json_lines = json_lines
+
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {name: getattr(record, name) for name in STRUCTURED_FIELDS
+                  if getattr(record, name, None) is not None}
+        if self.json_lines:
+            entry = {'time': self.formatTime(record), 'level': record.levelname,
+                     'logger': record.name, 'message': record.getMessage(), **fields}
+            if record.exc_info:
+                entry['exception'] = self.formatException(record.exc_info)
+            return json.dumps(entry, ensure_ascii=False, default=str)
+
+        line = super().format(record)
+        if fields:
+            line += ' | ' + ' '.join(f"{name}={value}" for name, value in fields.items())
+        return line
+
+
+def setup_logging(level: Optional[str] = None, json_lines: Optional[bool] = None,
+                  force: bool = False) -> Optional[QueueListener]:
+    """
+    Route all logging through a queue to a background listener thread.
+
+    Meant for entry points. Like logging.basicConfig(), it leaves an
+    application's own configuration alone: if the root logger already has
+    handlers, nothing changes unless `force` is set. Safe to call more than
+    once: later calls return the running listener.
+
+    Args:
+        level: Root level (default: LOG_LEVEL env var, else INFO)
+        json_lines: One JSON object per line (default: LOG_FORMAT=json)
+        force: Replace the root logger's existing handlers
+
+    Returns:
+        The listener, or None if existing handlers were left in place
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    root = logging.getLogger()
+    if root.handlers and not force:
+        return None
+
+    level = level or os.environ.get('LOG_LEVEL', 'INFO')
+    if json_lines is None:
+        json_lines = os.environ.get('LOG_FORMAT', '').lower() == 'json'
+
+    stream = logging.StreamHandler()
+    stream.setFormatter(StructuredFormatter(json_lines))
+    log_queue = queue.SimpleQueue()
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(level.upper() if isinstance(level, str) else level)
+    return _listener
+
+
+class ProgressReporter:
+    """
+    Counts listings per query and logs at most one progress line per
+    `interval` seconds ("query 'plumbers in Austin': 85/120, 14 listings/s"),
+    optionally mirrored to a status callback such as the Actor status message.
+
+    Usage:
+        progress = ProgressReporter(status_callback=Actor.set_status_message)
+        progress.start_query(query, target=120)
+        progress.add(query)            # per listing (cheap)
+        progress.add(query, failed=1)  # per listing that failed
+        progress.finish_query(query)   # or finish_query(query, failed=True)
+    """
+
+    def __init__(self, interval: float = 5.0,
+                 status_callback: Optional[Callable[[str], Awaitable]] = None):
+        """
+        Initialize the reporter.
+
+        Args:
+            interval: Minimum seconds between progress lines
+            status_callback: Async function receiving each progress line
+        """
+        self.interval = interval
+        self.status_callback = status_callback
+        self.queries = {}
+        self.total_found = 0
+        self.total_failed = 0
+        self.queries_done = 0
+        self.queries_failed = 0
+        self._last_emit = time.monotonic()
+        self._found_at_last_emit = 0
+        self._status_task = None
+
+    def start_query(self, query: str, target: Optional[int] = None):
+        self.queries[query] = {'found': 0, 'failed': 0, 'target': target,
+                               'started': time.monotonic()}
+
+    def add(self, query: str, found: int = 1, failed: int = 0):
+        """Count listings of a query; logs only when the interval has passed"""
+        counts = self.queries.get(query)
+        if counts is None:
+            self.start_query(query)
+            counts = self.queries[query]
+        counts['found'] += found
+        counts['failed'] += failed
+        self.total_found += found
+        self.total_failed += failed
+        if time.monotonic() - self._last_emit >= self.interval:
+            self._emit(query)
+
+    def finish_query(self, query: str, failed: bool = False):
+        """
+        Log the query's final count (always, one line per query).
+
+        Args:
+            query: The query
+            failed: The query itself failed (logged as a warning)
+        """
+        counts = self.queries.pop(query, None)
+        if counts is None:
+            return
+        self.queries_done += 1
+        elapsed = time.monotonic() - counts['started']
+        extra = {'query': query, 'found': counts['found'], 'failed': counts['failed'],
+                 'elapsed': round(elapsed, 1)}
+        if failed:
+            self.queries_failed += 1
+            logger.warning(f"Query '{query}' failed after {counts['found']} listings "
+                           f"in {elapsed:.1f}s", extra=extra)
+        else:
+            failed_listings = f", {counts['failed']} failed" if counts['failed'] else ''
+            logger.info(f"Query '{query}' done: {counts['found']} listings in "
+                        f"{elapsed:.1f}s{failed_listings}", extra=extra)
+        failed_queries = f" ({self.queries_failed} failed)" if self.queries_failed else ''
+        self._update_status(f"{self.queries_done} queries done{failed_queries}, "
+                            f"{self.total_found} listings")
+
+    def _emit(self, query: str):
+        now = time.monotonic()
+        rate = (self.total_found - self._found_at_last_emit) / max(now - self._last_emit, 1e-9)
+        self._last_emit = now
+        self._found_at_last_emit = self.total_found
+
+        counts = self.queries[query]
+        progress = f"{counts['found']}/{counts['target']}" if counts['target'] else f"{counts['found']}"
+        message = (f"query '{query}': {progress}, {rate:.0f} listings/s "
+                   f"({self.total_found} total, {self.queries_done} queries done)")
+        logger.info(message, extra={'query': query, 'found': counts['found'],
+                                    'target': counts['target'], 'rate': round(rate, 1)})
+        self._update_status(message)
+
+    def _update_status(self, message: str):
+        if self.status_callback is None:
+            return
+        # Fire and forget, skipping updates while the previous one is in flight
+        if self._status_task is not None and not self._status_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._status_task = loop.create_task(self._send_status(message))
+
+    async def _send_status(self, message: str):
+        try:
+            await self.status_callback(message)
+        except Exception as e:
+            logger.debug(f"Couldn't update status message: {e}")
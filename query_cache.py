@@ -0,0 +1,132 @@
+"""
+Query-level result cache for the Google Maps Scraper
+Caches each query's businesses in a named key-value store with a TTL, and
+coalesces duplicate queries so each one is scraped at most once per run
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Awaitable, Callable, Optional
+
+from planner import normalize_query
+
+
+logger = logging.getLogger(__name__)
+
+SOURCE_SCRAPED = 'scraped'
+SOURCE_CACHE = 'cache'
+SOURCE_COALESCED = 'coalesced'
+
+
+def query_signature(query: str, max_results: int, **variant) -> str:
+    """
+    Canonical cache key of a query.
+
+    Case and whitespace differences don't matter. `variant` holds anything
+    else that changes what gets scraped. Filters such as minRating are
+    applied after the cache, so they are not part of the key and filtered
+    runs share cached pages.
+    """
+    canonical = json.dumps({
+        'query': normalize_query(query).casefold(),
+        'max_results': max_results,
+        **variant,
+    }, sort_keys=True)
+    # Key-value store keys allow a limited character set; a hex digest fits
+    return f"query-{hashlib.sha256(canonical.encode('utf-8')).hexdigest()[:40]}"
+
+
+class QueryCache:
+    """
+    Per-query result cache with in-flight request coalescing.
+
+    Usage:
+        cache = await QueryCache.open('google-maps-query-cache', ttl_hours=12)
+        businesses, source = await cache.fetch(query, 20, scrape_fn)
+    """
+
+    def __init__(self, store=None, ttl_hours: float = 12):
+        """
+        Initialize the cache.
+
+        Args:
+            store: Key-value store with async get_value/set_value (None:
+                only coalesce duplicate queries within this run)
+            ttl_hours: How long cached results stay valid
+        """
+        self.store = store
+        self.ttl_seconds = ttl_hours * 3600
+        self.in_flight = {}
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'pages_saved': 0}
+
+    @classmethod
+    async def open(cls, name: str, ttl_hours: float = 12) -> 'QueryCache':
+        """Open the cache in a named key-value store (shared across runs)"""
+        from apify import Actor
+        return cls(await Actor.open_key_value_store(name=name), ttl_hours)
+
+    async def _read(self, key: str) -> Optional[list[dict]]:
+        if self.store is None:
+            return None
+        entry = await self.store.get_value(key)
+        if not entry:
+            return None
+        if time.time() - entry.get('cached_at', 0) > self.ttl_seconds:
+            return None
+        return entry.get('businesses')
+
+    async def fetch(self, query: str, max_results: int,
+                    scrape: Callable[[str, int], Awaitable[list[dict]]],
+                    **variant) -> tuple[list[dict], str]:
+        """
+        Return a query's businesses from the cache, or scrape and cache them.
+
+        A query already fetched or in flight in this run shares that result
+        instead of being scraped again.
+
+        Returns:
+            (businesses, source), where source is "scraped", "cache" or
+            "coalesced"
+        """
+        key = query_signature(query, max_results, **variant)
+        if key in self.in_flight:
+            self.stats['coalesced'] += 1
+            self.stats['pages_saved'] += 1
+            logger.info(f"Coalesced duplicate query '{query}'")
+            return await asyncio.shield(self.in_flight[key]), SOURCE_COALESCED
+
+        future = asyncio.get_running_loop().create_future()
+        self.in_flight[key] = future
+        try:
+            cached = await self._read(key)
+            if cached is not None:
+                self.stats['hits'] += 1
+                self.stats['pages_saved'] += 1
+                logger.info(f"Cache hit for '{query}' ({len(cached)} businesses)")
+                future.set_result(cached)
+                return cached, SOURCE_CACHE
+
+            self.stats['misses'] += 1
+            businesses = await scrape(query, max_results)
+            # An empty result is usually a failed or blocked page; don't keep it
+            if businesses and self.store is not None:
+                await self.store.set_value(key, {
+                    'query': query,
+                    'max_results': max_results,
+                    'cached_at': time.time(),
+                    'businesses': businesses,
+                })
+            future.set_result(businesses)
+            return businesses, SOURCE_SCRAPED
+        except BaseException as e:
+            # Let a later duplicate retry instead of inheriting the error
+            del self.in_flight[key]
+            if isinstance(e, asyncio.CancelledError):
+                future.cancel()
+            else:
+                future.set_exception(e)
+                future.exception()  # Mark as retrieved if nobody is waiting
+            raise
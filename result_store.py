@@ -0,0 +1,259 @@
+"""
+Indexed in-memory store for scraped businesses
+Keeps column arrays plus secondary indexes so lead filters and top-N
+rankings don't rescan every business
+"""
+
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Iterable, Iterator, Optional
+
+from website_check import has_real_website
+
+
+CITY_FROM_QUERY = re.compile(r'\b(?:in|near)\s+(.+)$', re.IGNORECASE)
+
+
+def city_of(business: dict) -> Optional[str]:
+    """Best-effort city of a business: explicit field, parsed address, campaign location, then query"""
+    if business.get('city'):
+        return business['city']
+    address_parts = business.get('address_parts') or {}
+    if address_parts.get('city'):
+        return address_parts['city']
+    if business.get('location'):
+        return business['location']
+    match = CITY_FROM_QUERY.search(business.get('query') or '')
+    return match.group(1).strip() if match else None
+
+
+class SortedIndex:
+    """Row ids ordered by a numeric column, re-sorted lazily after inserts"""
+
+    def __init__(self):
+        self.pairs = []
+        self.keys = []
+        self.dirty = False
+
+    def add(self, key: float, row_id: int):
+        self.pairs.append((key, row_id))
+        self.dirty = True
+
+    def _ensure_sorted(self):
+        if self.dirty:
+            # Timsort merges the already-sorted prefix with the new run
+            self.pairs.sort()
+            self.keys = [key for key, _ in self.pairs]
+            self.dirty = False
+
+    def count_at_least(self, minimum: float) -> int:
+        """Number of rows with key >= minimum"""
+        self._ensure_sorted()
+        return len(self.keys) - bisect_left(self.keys, minimum)
+
+    def at_least(self, minimum: float) -> list[int]:
+        """Row ids with key >= minimum"""
+        self._ensure_sorted()
+        start = bisect_left(self.keys, minimum)
+        return [row_id for _, row_id in self.pairs[start:]]
+
+    def descending(self) -> Iterator[int]:
+        """Row ids from highest to lowest key (ties: earliest row first)"""
+        self._ensure_sorted()
+        keys = self.keys
+        end = len(keys)
+        while end > 0:
+            # Walk each run of equal keys forwards to keep insertion order
+            start = bisect_left(keys, keys[end - 1], 0, end)
+            for _, row_id in self.pairs[start:end]:
+                yield row_id
+            end = start
+
+
+class ResultStore:
+    """
+    Columnar store of businesses with secondary indexes.
+
+    Indexes: has_website, rating (sorted), review_count (sorted), query and
+    city. Predicates passed to filter()/top() are resolved against the
+    indexes and intersected, smallest candidate set first.
+    """
+
+    def __init__(self, businesses: Optional[Iterable[dict]] = None):
+        """
+        Initialize the store.
+
+        Args:
+            businesses: Businesses to index (the store keeps references, not copies)
+        """
+        self.records = []
+        self.columns = {'rating': [], 'review_count': [],
+                        'has_website': [], 'query': [], 'city': []}
+        self.by_website = {True: set(), False: set()}
+        self.by_rating = SortedIndex()
+        self.by_reviews = SortedIndex()
+        self.by_query = defaultdict(set)
+        self.by_city = defaultdict(set)
+        if businesses:
+            self.extend(businesses)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.records)
+
+    def add(self, business: dict) -> int:
+        """Index a business and return its row id"""
+        row_id = len(self.records)
+        rating = business.get('rating') or 0
+        review_count = business.get('review_count') or 0
+        # A website found dead, parked or social-only doesn't count
+        has_website = has_real_website(business)
+        query = business.get('query')
+        city = city_of(business)
+
+        self.records.append(business)
+        self.columns['rating'].append(rating)
+        self.columns['review_count'].append(review_count)
+        self.columns['has_website'].append(has_website)
+        self.columns['query'].append(query)
+        self.columns['city'].append(city)
+
+        self.by_website[has_website].add(row_id)
+        self.by_rating.add(rating, row_id)
+        self.by_reviews.add(review_count, row_id)
+        if query:
+            self.by_query[query].add(row_id)
+        if city:
+            self.by_city[city.casefold()].add(row_id)
+        return row_id
+
+    def extend(self, businesses: Iterable[dict]):
+        """Index several businesses"""
+        for business in businesses:
+            self.add(business)
+
+    def rows(self, row_ids: Iterable[int]) -> list[dict]:
+        """Businesses for the given row ids, in row order"""
+        return [self.records[i] for i in sorted(row_ids)]
+
+    def _candidates(self, has_website: Optional[bool] = None,
+                    min_rating: Optional[float] = None,
+                    min_reviews: Optional[int] = None,
+                    query: Optional[str] = None,
+                    city: Optional[str] = None) -> Optional[set]:
+        """
+        Row ids matching all predicates (None: no predicate given).
+
+        The most selective index drives the scan; the remaining predicates
+        are checked against the column arrays for those rows only.
+        """
+        # (estimated size, row ids, per-row check)
+        drivers = []
+        columns = self.columns
+        if has_website is not None:
+            ids = self.by_website[bool(has_website)]
+            drivers.append((len(ids), ids,
+                            lambda i: columns['has_website'][i] == bool(has_website)))
+        if query is not None:
+            ids = self.by_query.get(query, set())
+            drivers.append((len(ids), ids, lambda i: columns['query'][i] == query))
+        if city is not None:
+            ids = self.by_city.get(city.casefold(), set())
+            drivers.append((len(ids), ids,
+                            lambda i: (columns['city'][i] or '').casefold() == city.casefold()))
+        if min_rating is not None:
+            size = self.by_rating.count_at_least(min_rating)
+            drivers.append((size, lambda: self.by_rating.at_least(min_rating),
+                            lambda i: columns['rating'][i] >= min_rating))
+        if min_reviews is not None:
+            size = self.by_reviews.count_at_least(min_reviews)
+            drivers.append((size, lambda: self.by_reviews.at_least(min_reviews),
+                            lambda i: columns['review_count'][i] >= min_reviews))
+        if not drivers:
+            return None
+
+        drivers.sort(key=lambda driver: driver[0])
+        _, ids, _ = drivers[0]
+        if callable(ids):
+            ids = ids()
+        checks = [check for _, _, check in drivers[1:]]
+        if not checks:
+            # Callers only read candidate sets, so the index set can be shared
+            return ids if isinstance(ids, set) else set(ids)
+        return {i for i in ids if all(check(i) for check in checks)}
+
+    def filter(self, **predicates) -> list[dict]:
+        """
+        Businesses matching all predicates, in scrape order.
+
+        Args:
+            has_website: True/False to require or exclude a website
+            min_rating: Minimum rating (missing ratings count as 0)
+            min_reviews: Minimum review count (missing counts as 0)
+            query: Exact search query
+            city: City name (case-insensitive)
+        """
+        candidates = self._candidates(**predicates)
+        if candidates is None:
+            return list(self.records)
+        return self.rows(candidates)
+
+    def count(self, **predicates) -> int:
+        """Number of businesses matching all predicates"""
+        candidates = self._candidates(**predicates)
+        return len(self.records) if candidates is None else len(candidates)
+
+    def _ranked(self, by: str) -> Iterator[int]:
+        if by == 'rating':
+            return self.by_rating.descending()
+        if by == 'review_count':
+            return self.by_reviews.descending()
+        raise ValueError(f"Can't rank by '{by}' (use 'rating' or 'review_count')")
+
+    def top(self, n: int, by: str = 'rating', **predicates) -> list[dict]:
+        """
+        Highest-ranked businesses matching the predicates.
+
+        Walks the sorted index from the top and stops after n matches, so
+        it only touches as many rows as it needs.
+        """
+        candidates = self._candidates(**predicates)
+        results = []
+        for row_id in self._ranked(by):
+            if len(results) >= n:
+                break
+            if candidates is None or row_id in candidates:
+                results.append(self.records[row_id])
+        return results
+
+    def top_per(self, n: int, group_by: str = 'city', by: str = 'rating',
+                **predicates) -> dict[str, list[dict]]:
+        """
+        Top n businesses per city or query, e.g. highest-rated no-website
+        leads per city: store.top_per(5, has_website=False)
+        """
+        if group_by not in ('city', 'query'):
+            raise ValueError(f"Can't group by '{group_by}' (use 'city' or 'query')")
+        candidates = self._candidates(**predicates)
+        groups = self.columns[group_by]
+        if candidates is None:
+            open_groups = {g for g in groups if g}
+        else:
+            open_groups = {groups[i] for i in candidates if groups[i]}
+
+        results = defaultdict(list)
+        for row_id in self._ranked(by):
+            if not open_groups:
+                break
+            group = groups[row_id]
+            if group not in open_groups:
+                continue
+            if candidates is not None and row_id not in candidates:
+                continue
+            results[group].append(self.records[row_id])
+            if len(results[group]) >= n:
+                open_groups.discard(group)
+        return dict(results)
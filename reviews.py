@@ -0,0 +1,203 @@
+"""
+Streaming review extractor for Google Maps place pages
+Scrolls the reviews pane incrementally and yields reviews as they load,
+emptying the DOM nodes already read so the page's memory stays bounded
+"""
+
+import logging
+import re
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Optional
+
+from playwright.async_api import Page
+
+
+logger = logging.getLogger(__name__)
+
+REVIEWS_TAB = 'button[role="tab"]:has-text("Reviews")'
+SORT_BUTTON = 'button[aria-label*="Sort"]'
+SORT_NEWEST = '[role="menuitemradio"]:has-text("Newest")'
+REVIEW_NODE = 'div[data-review-id][aria-label]'
+MORE_BUTTON = 'button[aria-label="See more"], button.w8nwRe'
+
+# Clicks "See more" on every review not read yet, remembering the length of
+# each clicked review's text so the read can wait for the expansion
+EXPAND_JS = """
+([selector, more]) => {
+    let clicked = 0;
+    for (const node of document.querySelectorAll(selector)) {
+        if (node.dataset.scraped || node.dataset.expanding !== undefined) continue;
+        const button = node.querySelector(more);
+        if (!button) continue;
+        const text = node.querySelector('.wiI7pd');
+        node.dataset.expanding = text ? text.innerText.length : 0;
+        button.click();
+        clicked++;
+    }
+    return clicked;
+}
+"""
+
+# True once every clicked review's button is gone or its text has changed
+EXPANDED_JS = """
+([selector, more]) => [...document.querySelectorAll(selector)].every(node => {
+    if (node.dataset.scraped || node.dataset.expanding === undefined) return true;
+    const button = node.querySelector(more);
+    const text = node.querySelector('.wiI7pd');
+    return !button || button.offsetParent === null
+        || String(text ? text.innerText.length : 0) !== node.dataset.expanding;
+})
+"""
+
+# Reads every review node not read yet, then empties it. The node itself is
+# kept with its height pinned so the pane's scroll position and lazy loading
+# keep working, but its subtree (text, photos, avatars) is released.
+READ_AND_RELEASE_JS = """
+(selector) => {
+    const reviews = [];
+    for (const node of document.querySelectorAll(selector)) {
+        if (node.dataset.scraped) continue;
+        const stars = node.querySelector('[role="img"][aria-label*="star"]');
+        const text = node.querySelector('.wiI7pd');
+        const date = node.querySelector('.rsqaWe');
+        reviews.push({
+            review_id: node.dataset.reviewId,
+            author: node.getAttribute('aria-label'),
+            rating: stars ? stars.getAttribute('aria-label') : null,
+            date_text: date ? date.innerText : null,
+            text: text ? text.innerText : null,
+        });
+        node.dataset.scraped = '1';
+        node.style.height = node.offsetHeight + 'px';
+        node.replaceChildren();
+    }
+    return reviews;
+}
+"""
+
+SCROLL_PANE_JS = """
+(selector) => {
+    const node = document.querySelector(selector);
+    let pane = node && node.parentElement;
+    while (pane && pane.scrollHeight <= pane.clientHeight) pane = pane.parentElement;
+    if (!pane) return false;
+    pane.scrollTop = pane.scrollHeight;
+    return true;
+}
+"""
+
+RELATIVE_UNITS = {
+    'minute': timedelta(minutes=1), 'hour': timedelta(hours=1),
+    'day': timedelta(days=1), 'week': timedelta(weeks=1),
+    'month': timedelta(days=30), 'year': timedelta(days=365),
+}
+
+
+def to_naive_utc(value: datetime) -> datetime:
+    """Naive UTC datetime (aware values are converted, naive ones taken as UTC)"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def parse_since(text: Optional[str]) -> Optional[datetime]:
+    """
+    Parse a "since" date such as "2024-05-01" or "2024-05-01T00:00:00Z".
+
+    Returns:
+        Naive UTC datetime, or None for an empty value
+
+    Raises:
+        ValueError: The text isn't an ISO date or datetime
+    """
+    if not text:
+        return None
+    try:
+        return to_naive_utc(datetime.fromisoformat(text.strip()))
+    except ValueError:
+        raise ValueError(f"Invalid reviews date '{text}' (use YYYY-MM-DD)") from None
+
+
+def parse_relative_date(text: Optional[str], now: Optional[datetime] = None) -> Optional[datetime]:
+    """
+    Approximate date of "3 weeks ago", "a month ago", "Edited 2 years ago",
+    "yesterday", as a naive UTC datetime
+    """
+    if not text:
+        return None
+    now = to_naive_utc(now) if now else datetime.now(timezone.utc).replace(tzinfo=None)
+    text = text.lower()
+    if 'yesterday' in text:
+        return now - timedelta(days=1)
+    match = re.search(r'\b(a|an|\d+)\s+(minute|hour|day|week|month|year)s?\s+ago', text)
+    if not match:
+        return None
+    count = 1 if match.group(1) in ('a', 'an') else int(match.group(1))
+    return now - count * RELATIVE_UNITS[match.group(2)]
+
+
+def _parse_rating(label: Optional[str]) -> Optional[float]:
+    match = re.search(r'(\d+(?:[.,]\d)?)', label or '')
+    return float(match.group(1).replace(',', '.')) if match else None
+
+
+async def _open_reviews(page: Page, sort_newest: bool):
+    await page.locator(REVIEWS_TAB).first.click(timeout=10000)
+    await page.wait_for_selector(REVIEW_NODE, timeout=10000)
+    if sort_newest:
+        try:
+            await page.locator(SORT_BUTTON).first.click(timeout=5000)
+            await page.locator(SORT_NEWEST).first.click(timeout=5000)
+            await page.wait_for_timeout(1500)
+        except Exception as e:
+            logger.debug(f"Couldn't sort reviews by newest: {e}")
+
+
+async def stream_reviews(page: Page, place_url: str, max_reviews: int = 50,
+                         since: Optional[datetime] = None,
+                         max_idle_scrolls: int = 3) -> AsyncIterator[dict]:
+    """
+    Yield a place's reviews as the pane loads them.
+
+    Args:
+        page: Page to navigate (it is left on the place page)
+        place_url: Google Maps place URL
+        max_reviews: Stop after this many reviews
+        since: Stop at the first review older than this (reviews are sorted
+            newest first for this; naive values are taken as UTC)
+        max_idle_scrolls: Give up after this many scrolls load nothing new
+
+    Yields:
+        Dicts with review_id, author, rating, date_text, date, text
+    """
+    await page.goto(place_url, wait_until='domcontentloaded', timeout=30000)
+    await _open_reviews(page, sort_newest=since is not None)
+    if since is not None:
+        since = to_naive_utc(since)
+
+    count, idle = 0, 0
+    while count < max_reviews and idle < max_idle_scrolls:
+        # Expand truncated reviews and wait for the full text before reading
+        if await page.evaluate(EXPAND_JS, [REVIEW_NODE, MORE_BUTTON]):
+            try:
+                await page.wait_for_function(EXPANDED_JS, arg=[REVIEW_NODE, MORE_BUTTON],
+                                             timeout=3000)
+            except Exception as e:
+                logger.debug(f"Reviews didn't finish expanding: {e}")
+        batch = await page.evaluate(READ_AND_RELEASE_JS, REVIEW_NODE)
+        idle = 0 if batch else idle + 1
+
+        for review in batch:
+            review['rating'] = _parse_rating(review['rating'])
+            date = parse_relative_date(review['date_text'])
+            review['date'] = date.date().isoformat() if date else None
+            if since and date and date < since:
+                return
+            yield review
+            count += 1
+            if count >= max_reviews:
+                return
+
+        if not await page.evaluate(SCROLL_PANE_JS, REVIEW_NODE):
+            break
+        await page.wait_for_timeout(1200)
@@ -4,6 +4,7 @@ Quick start example for Google Maps Scraper
 
 import asyncio
 from scraper_simple import GoogleMapsScraper
+from progress import setup_logging
 
 
 async def main():
@@ -55,4 +56,5 @@ async def main():
 
 
 if __name__ == "__main__":
+    setup_logging()
     asyncio.run(main())
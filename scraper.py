@@ -6,35 +6,47 @@ Extracts business data suitable for building landing pages
 import asyncio
 import json
 import logging
-from datetime import datetime
-from typing import Optional
+from collections import defaultdict
+from contextlib import suppress
+from datetime import datetime, timedelta
+from typing import AsyncIterator, Awaitable, Callable, Optional
 from pathlib import Path
+from urllib.parse import quote_plus
 
 from crawlee.playwright_crawler import PlaywrightCrawler
 from crawlee.configuration import Configuration
-from crawlee import CrawlResult
+from crawlee import CrawlResult, Request
+
+from browser_profiles import DEFAULT_PROFILE, get_profile
+from planner import normalize_query
+from progress import ProgressReporter, setup_logging
 
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
 
 class GoogleMapsScraper:
     """Scraper for Google Maps businesses without websites"""
 
-    def __init__(self, search_queries: list[str], output_dir: str = "./output"):
+    def __init__(self, search_queries: list[str], output_dir: str = "./output",
+                 launch_profile: str = DEFAULT_PROFILE, headless: bool = True,
+                 user_agent: Optional[str] = None, progress: Optional[ProgressReporter] = None):
         """
         Initialize the scraper.
 
         Args:
             search_queries: List of search queries (e.g., ["restaurants in New York", "plumbers in Boston"])
             output_dir: Directory to save results
+            launch_profile: Browser launch profile ("lean" or "compat")
+            headless: Run the browser without a window
+            user_agent: Custom user agent (default: the browser's own)
+            progress: Counts listings and logs sampled progress lines
         """
         self.search_queries = search_queries
+        self.profile = get_profile(launch_profile)
+        self.headless = headless
+        self.user_agent = user_agent
+        self.progress = progress or ProgressReporter()
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         self.businesses = []
@@ -47,59 +59,165 @@ class GoogleMapsScraper:
         Returns:
             List of business dictionaries with extracted data
         """
+        async for business_data in self.iter_businesses():
+            self.businesses.append(business_data)
+        return self.businesses
+
+    async def iter_businesses(self, max_buffered: int = 100,
+                              concurrency: int = 8) -> AsyncIterator[dict]:
+        """
+        Yield businesses without websites as the crawler extracts them.
+
+        Records are not kept in self.businesses, so a consumer can pipe them
+        into its own sink without holding the whole run in memory. At most
+        `max_buffered` records wait for the consumer; beyond that, extraction
+        pauses until the consumer catches up.
+
+        Usage:
+            async for business in scraper.iter_businesses():
+                await sink.write(business)
+
+        Args:
+            max_buffered: Records extracted ahead of the consumer
+            concurrency: Listing cards of a page extracted at once (within a
+                page, records arrive in completion order)
+
+        Yields:
+            Business dictionaries, tagged with their query
+        """
+        queue = asyncio.Queue(maxsize=max_buffered)
+        done = object()
+
+        async def produce():
+            try:
+                await self._crawl(queue.put, concurrency)
+            except asyncio.CancelledError:
+                # The consumer stopped early: nobody reads the queue any more,
+                # so waiting for room for the sentinel would hang
+                raise
+            except Exception:
+                await queue.put(done)
+                raise
+            await queue.put(done)
+
+        producer = asyncio.create_task(produce())
+        try:
+            while True:
+                business_data = await queue.get()
+                if business_data is done:
+                    break
+                yield business_data
+            await producer  # Surface a crawler setup error
+        finally:
+            # The consumer stopped early: stop crawling too
+            if not producer.done():
+                producer.cancel()
+                with suppress(asyncio.CancelledError):
+                    await producer
+
+    async def _crawl(self, emit: Callable[[dict], Awaitable[None]], concurrency: int):
+        """Run every query through the crawler, awaiting emit() for each kept record"""
         # Configure Crawlee
         configuration = Configuration(
             persistent_storage_enabled=False,
             max_request_retries=3,
         )
 
-        # Create crawler
+        # Crawlee takes headless separately from the other launch options
+        launch_options = self.profile.launch_options(self.headless)
+        del launch_options['headless']
+
+        # Create crawler; a slow consumer holds the handler in emit(), so
+        # allow more than the default minute before Crawlee retries the page
         self.crawler = PlaywrightCrawler(
             configuration=configuration,
             max_requests_per_crawl=100,
             max_crawl_depth=2,
+            request_handler_timeout=timedelta(minutes=5),
+            headless=self.headless,
+            browser_launch_options=launch_options,
+            browser_new_context_options=self.profile.context_options(self.user_agent),
         )
 
+        # Feed positions already emitted per request, so a retried request (e.g.
+        # after a handler timeout) doesn't emit them again
+        emitted = defaultdict(set)
+
         @self.crawler.router.default_handler
         async def handle_page(context):
-            """Handle Google Maps search results page"""
-            try:
-                page = context.page
-                await page.wait_for_load_state("networkidle", timeout=10000)
-
-                # Get all business listings
-                businesses = await page.locator('[role="feed"] > div').all()
-                logger.info(f"Found {len(businesses)} business listings")
-
-                for business_elem in businesses:
-                    try:
-                        # Extract business information
-                        business_data = await self._extract_business_data(business_elem, page)
-
-                        if business_data and not self._has_website(business_data):
-                            self.businesses.append(business_data)
-                            logger.info(
-                                f"Added: {business_data.get('name', 'Unknown')}")
-
-                    except Exception as e:
-                        logger.warning(f"Error extracting business data: {e}")
-                        continue
-
-            except Exception as e:
-                logger.error(f"Error handling page: {e}")
+            await self._handle_page(context, emit, concurrency,
+                                    emitted[context.request.unique_key])
 
         # Process each search query
         for query in self.search_queries:
             logger.info(f"Scraping: {query}")
             search_url = self._build_google_maps_url(query)
+            self.progress.start_query(query)
 
+            failed = True
             try:
-                await self.crawler.run([search_url])
+                await self.crawler.run([Request.from_url(search_url, user_data={'query': query})])
+                failed = False
             except Exception as e:
                 logger.error(f"Error scraping {query}: {e}")
-                continue
+            finally:
+                self.progress.finish_query(query, failed=failed)
 
-        return self.businesses
+    async def _handle_page(self, context, emit: Callable[[dict], Awaitable[None]],
+                           concurrency: int, emitted: set):
+        """
+        Handle a Google Maps search results page.
+
+        Args:
+            context: Crawlee request context
+            emit: Awaited for each kept record
+            concurrency: Listing cards extracted at once
+            emitted: Feed positions of the cards this request already
+                emitted; a retry re-reads the same feed and skips them
+        """
+        try:
+            page = context.page
+            await page.wait_for_load_state("networkidle", timeout=10000)
+
+            # Get all business listings
+            businesses = await page.locator('[role="feed"] > div').all()
+            logger.debug(f"Found {len(businesses)} business listings")
+
+            query = context.request.user_data.get('query')
+            slots = asyncio.Semaphore(concurrency)
+
+            async def extract(position, business_elem):
+                async with slots:
+                    try:
+                        # Extract business information
+                        business_data = await self._extract_business_data(business_elem, page)
+                    except Exception as e:
+                        logger.debug(f"Error extracting business data: {e}")
+                        self.progress.add(query, found=0, failed=1)
+                        return
+
+                if business_data and not self._has_website(business_data):
+                    # Cards can share a name and lack an address, so the
+                    # card's position identifies the record, not its fields
+                    if position in emitted:
+                        return
+                    emitted.add(position)
+                    business_data['query'] = query
+                    try:
+                        await emit(business_data)
+                    except BaseException:
+                        # Not delivered (e.g. the handler timed out while the
+                        # consumer was slow), so a retry may emit it
+                        emitted.discard(position)
+                        raise
+                    self.progress.add(query)
+                    logger.debug(f"Added: {business_data.get('name', 'Unknown')}")
+
+            await asyncio.gather(*(extract(position, elem)
+                                   for position, elem in enumerate(businesses)))
+
+        except Exception as e:
+            logger.error(f"Error handling page: {e}")
 
     async def _extract_business_data(self, element, page) -> Optional[dict]:
         """Extract business information from listing element"""
@@ -159,7 +277,7 @@ class GoogleMapsScraper:
             }
 
         except Exception as e:
-            logger.warning(f"Error extracting business data: {e}")
+            logger.debug(f"Error extracting business data: {e}")
             return None
 
     def _has_website(self, business_data: dict) -> bool:
@@ -170,7 +288,7 @@ class GoogleMapsScraper:
         """Build Google Maps search URL"""
         # Note: Direct Google Maps scraping is challenging due to JavaScript rendering
         # This URL pattern works with headless browsers
-        query_encoded = query.replace(' ', '+')
+        query_encoded = quote_plus(normalize_query(query))
         return f"https://www.google.com/maps/search/{query_encoded}"
 
     def save_results(self, filename: Optional[str] = None) -> str:
@@ -272,4 +390,6 @@ async def main():
 
 
 if __name__ == "__main__":
+    # Configure logging (queued, so log I/O stays off the scraping loop)
+    setup_logging()
     asyncio.run(main())
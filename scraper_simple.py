@@ -7,34 +7,178 @@ Focus: Small & Medium Businesses (SMBs) without websites
 import asyncio
 import json
 import logging
+import re
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Optional
+from typing import AsyncIterator, Callable, Optional
 from pathlib import Path
+from urllib.parse import quote_plus
 
 from playwright.async_api import async_playwright, Browser, Page
 
+from browser_profiles import DEFAULT_PROFILE, get_profile
+from config import ScraperConfig
+from delta import record_key
+from memory_watchdog import MemoryWatchdog
+from planner import normalize_query
+from profiling import RunProfiler
+from query_cache import SOURCE_COALESCED, QueryCache
+from har_archive import QueryArchive
+from website_check import WebsiteChecker
+from result_store import ResultStore
+from reviews import stream_reviews
+from sqlite_export import LeadDatabase
+from progress import ProgressReporter, setup_logging
+
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
 
+# Place identifiers embedded in Google Maps place URLs, most stable first
+PLACE_ID_PATTERNS = [
+    re.compile(r'!19s(ChIJ[^!?&/]+)'),
+    re.compile(r'!1s(0x[0-9a-f]+:0x[0-9a-f]+)'),
+]
+
+
+def parse_place_id(url: Optional[str]) -> Optional[str]:
+    """Extract the place ID from a Google Maps place URL"""
+    if not url:
+        return None
+    for pattern in PLACE_ID_PATTERNS:
+        match = pattern.search(url)
+        if match:
+            return match.group(1)
+    return None
+
 
 class GoogleMapsScraper:
     """Scraper for Google Maps businesses"""
 
-    def __init__(self, output_dir: str = "./output"):
+    def __init__(self, output_dir: str = "./output", watchdog: Optional[MemoryWatchdog] = None,
+                 cache: Optional[QueryCache] = None, archive: Optional[QueryArchive] = None,
+                 launch_profile: str = DEFAULT_PROFILE, headless: bool = True,
+                 user_agent: Optional[str] = None, profiler: Optional[RunProfiler] = None,
+                 progress: Optional[ProgressReporter] = None, raise_errors: bool = False):
         """
         Initialize the scraper.
 
         Args:
             output_dir: Directory to save results
+            watchdog: Decides when to recycle pages and restart the browser
+                (default: a watchdog using the Actor's memory limit)
+            cache: Query result cache; duplicate queries are then also only
+                scraped once per run
+            archive: Record each query's traffic to, or replay it from, HAR
+                archives
+            launch_profile: Browser launch profile ("lean" or "compat")
+            headless: Run the browser without a window
+            user_agent: Custom user agent (default: the browser's own)
+            profiler: Tags samples by query and phase and collects browser
+                metrics for a sample of pages (default: disabled)
+            progress: Counts listings and logs sampled progress lines
+            raise_errors: Re-raise a failed query's error instead of
+                returning no businesses (so a task queue can retry it)
         """
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(exist_ok=True)
         self.businesses = []
+        self.watchdog = watchdog or MemoryWatchdog()
+        self.cache = cache
+        self.archive = archive
+        self.profiler = profiler or RunProfiler(enabled=False)
+        self.progress = progress or ProgressReporter()
+        self.raise_errors = raise_errors
+        self.profile = get_profile(launch_profile)
+        self.launch_options = self.profile.launch_options(headless)
+        self.context_options = self.profile.context_options(user_agent)
+        # Replayed responses arrive instantly, so fixed waits can be shorter
+        self.wait_scale = 0.1 if archive and archive.replaying else 1.0
+        # Search pages loaded from the network (cache hits and replays don't count)
+        self.page_loads = 0
+        # Businesses already returned by an earlier query of this run
+        self.seen_keys = set()
+        self.duplicates = 0
+        self._store = None
+        self._store_source = None
+        self._playwright = None
+        self._browser = None
+        self._page = None
+        self._navigations = 0
+
+    @classmethod
+    def from_config(cls, config: ScraperConfig, **kwargs) -> 'GoogleMapsScraper':
+        """Create a scraper with a ScraperConfig's output and browser settings"""
+        return cls(output_dir=config.output_dir, launch_profile=config.launch_profile,
+                   headless=config.headless, user_agent=config.user_agent, **kwargs)
+
+    @property
+    def results(self) -> ResultStore:
+        """Indexed view of self.businesses, kept in sync as the list grows"""
+        store = self._store
+        if store is None or self._store_source is not self.businesses or len(store) > len(self.businesses):
+            store = self._store = ResultStore()
+            self._store_source = self.businesses
+        if len(store) < len(self.businesses):
+            store.extend(self.businesses[len(store):])
+        return store
+
+    @asynccontextmanager
+    async def browser_session(self):
+        """Keep one browser open for the duration of the block (reentrant)"""
+        if self._browser is not None:
+            yield
+            return
+
+        async with async_playwright() as p:
+            self._playwright = p
+            await self._start_browser()
+            try:
+                yield
+            finally:
+                await self._browser.close()
+                self._browser = None
+                self._page = None
+                self._playwright = None
+
+    async def _start_browser(self):
+        self._browser = await self._playwright.chromium.launch(**self.launch_options)
+        self._page = None
+
+    async def _acquire_page(self) -> Page:
+        """
+        Return the shared page, recycling it or the browser first when the
+        memory watchdog says so. Queries run one at a time, so nothing is in
+        flight here and the browser is already drained.
+        """
+        before = self.watchdog.sample()
+        if self.watchdog.should_restart_browser(before):
+            await self._browser.close()
+            await self._start_browser()
+            self.watchdog.record_recycle('browser', before, self.watchdog.sample())
+        elif self._page is not None and self.watchdog.should_recycle_page(before, self._navigations):
+            await self._close_page()
+            self.watchdog.record_recycle('page', before, self.watchdog.sample())
+
+        if self._page is None:
+            self._page = await self._browser.new_page(**self.context_options)
+            self._navigations = 0
+        self._navigations += 1
+        return self._page
+
+    async def _close_page(self):
+        if self._page is not None:
+            try:
+                await self._page.close()
+            except Exception as e:
+                logger.warning(f"Error closing page: {e}")
+            self._page = None
+
+    async def _recover(self):
+        """Drop the page after a failure, relaunching the browser if it crashed"""
+        await self._close_page()
+        if self._browser is not None and not self._browser.is_connected():
+            logger.warning("Browser disconnected; relaunching it")
+            await self._start_browser()
 
     async def scrape_query(self, query: str, max_results: int = 20) -> list[dict]:
         """
@@ -45,37 +189,130 @@ class GoogleMapsScraper:
             max_results: Maximum number of results to extract
 
         Returns:
-            List of business dictionaries
+            List of business dictionaries (businesses an earlier query
+            already returned are left out)
         """
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
+        if self.cache is None:
+            businesses = await self._scrape_page(query, max_results)
+        else:
+            businesses, source = await self.cache.fetch(query, max_results, self._scrape_page)
+            if source == SOURCE_COALESCED:
+                # Already collected (and passed to on_results) when this
+                # query first ran
+                return []
+
+        fresh = []
+        for business in businesses:
+            key = record_key(business)
+            if key in self.seen_keys:
+                self.duplicates += 1
+                continue
+            self.seen_keys.add(key)
+            business['query'] = query
+            fresh.append(business)
+        self.businesses.extend(fresh)
+        return fresh
+
+    async def _scrape_page(self, query: str, max_results: int) -> list[dict]:
+        """Load the search page for a query and extract its businesses"""
+        async with self.browser_session():
+            if self.archive is not None:
+                try:
+                    async with self.archive.page(self._browser, query, max_results,
+                                                 **self.context_options) as page:
+                        return await self._load_and_extract(page, query, max_results)
+                except Exception as e:
+                    logger.error(f"Error scraping '{query}': {e}")
+                    await self._recover()
+                    if self.raise_errors:
+                        raise
+                    return []
 
             try:
-                logger.info(f"Scraping: {query}")
+                page = await self._acquire_page()
+                return await self._load_and_extract(page, query, max_results)
+            except Exception as e:
+                logger.error(f"Error scraping '{query}': {e}")
+                # Don't reuse a page left in an unknown state
+                await self._recover()
+                if self.raise_errors:
+                    raise
+                return []
 
-                # Build and navigate to Google Maps search
-                search_url = self._build_google_maps_url(query)
-                await page.goto(search_url, wait_until='networkidle', timeout=30000)
+    async def _load_and_extract(self, page: Page, query: str, max_results: int) -> list[dict]:
+        logger.info(f"Scraping: {query}")
+        self.progress.start_query(query, max_results)
 
-                # Wait for results to load
-                await page.wait_for_timeout(3000)
+        # Build and navigate to Google Maps search
+        search_url = self._build_google_maps_url(query)
+        if self.wait_scale == 1.0:
+            self.page_loads += 1
 
-                businesses = await self._extract_businesses(page, max_results)
-                self.businesses.extend(businesses)
+        failed = True
+        try:
+            async with self.profiler.page(page, query):
+                with self.profiler.phase('navigate', query):
+                    await page.goto(search_url, wait_until='networkidle', timeout=30000)
+
+                    # Wait for results to load
+                    await page.wait_for_timeout(3000 * self.wait_scale)
+
+                with self.profiler.phase('extract', query):
+                    businesses = await self._extract_businesses(page, max_results, query)
+            failed = False
+        finally:
+            self.progress.finish_query(query, failed=failed)
+        return businesses
+
+    async def stream_reviews(self, business: dict, max_reviews: int = 50,
+                             since: Optional[datetime] = None) -> AsyncIterator[dict]:
+        """
+        Yield a business's reviews from its place page as they load.
+
+        Args:
+            business: Scraped business with a place_url
+            max_reviews: Per-place cap
+            since: Only reviews newer than this
 
-                logger.info(
-                    f"Found {len(businesses)} businesses for '{query}'")
-                return businesses
+        Yields:
+            Review dicts linked to the business by place_id
+        """
+        if not business.get('place_url'):
+            return
 
+        async with self.browser_session():
+            try:
+                page = await self._acquire_page()
+                async for review in stream_reviews(page, business['place_url'],
+                                                   max_reviews=max_reviews, since=since):
+                    yield {
+                        'place_id': business.get('place_id'),
+                        'place_name': business.get('name'),
+                        **review,
+                        'scraped_at': datetime.now().isoformat(),
+                    }
             except Exception as e:
-                logger.error(f"Error scraping '{query}': {e}")
-                return []
+                logger.warning(f"Error scraping reviews of '{business.get('name')}': {e}")
+                await self._recover()
 
-            finally:
-                await browser.close()
+    async def verify_websites(self, **checker_options) -> dict:
+        """
+        Check every listed website and mark dead, parked and social-only
+        ones, which filter_no_website then treats as no website.
 
-    async def _extract_businesses(self, page: Page, max_results: int) -> list[dict]:
+        Args:
+            **checker_options: WebsiteChecker settings (concurrency, timeout, ...)
+
+        Returns:
+            Counts per website status
+        """
+        async with WebsiteChecker(**checker_options) as checker:
+            counts = await checker.verify(self.businesses)
+        self._store = None  # has_website changed; re-index on next access
+        return counts
+
+    async def _extract_businesses(self, page: Page, max_results: int,
+                                  query: Optional[str] = None) -> list[dict]:
         """Extract business information from the page"""
         businesses = []
 
@@ -83,11 +320,11 @@ class GoogleMapsScraper:
             # Scroll through results to load more
             for _ in range(3):
                 await page.evaluate("window.scrollBy(0, window.innerHeight)")
-                await page.wait_for_timeout(1000)
+                await page.wait_for_timeout(1000 * self.wait_scale)
 
             # Find all business listing elements
             listings = await page.query_selector_all('[data-index]')
-            logger.info(f"Found {len(listings)} listing elements")
+            logger.debug(f"Found {len(listings)} listing elements")
 
             for i, listing in enumerate(listings[:max_results]):
                 try:
@@ -102,9 +339,14 @@ class GoogleMapsScraper:
 
                     # Get the business link/data
                     link_elem = await listing.query_selector('a[href*="maps/place"]')
+                    place_url = None
+                    if link_elem:
+                        place_url = await link_elem.get_attribute('href')
 
                     business_data = {
                         'name': name.strip(),
+                        'place_id': parse_place_id(place_url),
+                        'place_url': place_url,
                         'rating': None,
                         'review_count': None,
                         'address': None,
@@ -168,9 +410,11 @@ class GoogleMapsScraper:
                     # Only add if we have a name
                     if business_data['name']:
                         businesses.append(business_data)
+                        self.progress.add(query)
 
                 except Exception as e:
-                    logger.warning(f"Error extracting business {i}: {e}")
+                    logger.debug(f"Error extracting business {i}: {e}")
+                    self.progress.add(query, found=0, failed=1)
                     continue
 
             return businesses
@@ -181,28 +425,35 @@ class GoogleMapsScraper:
 
     def _build_google_maps_url(self, query: str) -> str:
         """Build Google Maps search URL"""
-        query_encoded = query.replace(' ', '+')
+        query_encoded = quote_plus(normalize_query(query))
         return f"https://www.google.com/maps/search/{query_encoded}"
 
-    async def scrape_multiple(self, queries: list[str], max_per_query: int = 20):
+    async def scrape_multiple(self, queries: list[str], max_per_query: int = 20,
+                              on_results: Optional[Callable[[list[dict]], None]] = None):
         """
         Scrape multiple search queries.
 
         Args:
             queries: List of search queries
             max_per_query: Max results per query
+            on_results: Called with each query's businesses as soon as it finishes
         """
-        for query in queries:
-            await self.scrape_query(query, max_per_query)
-            await asyncio.sleep(2)  # Be respectful with timing
+        async with self.browser_session():
+            for query in queries:
+                page_loads = self.page_loads
+                businesses = await self.scrape_query(query, max_per_query)
+                if on_results and businesses:
+                    on_results(businesses)
+                if self.page_loads > page_loads:
+                    await asyncio.sleep(2)  # Be respectful with timing
 
     def filter_no_website(self) -> list[dict]:
-        """Filter businesses that don't have a website"""
-        return [b for b in self.businesses if not b.get('website')]
+        """Filter businesses that don't have a website (or a dead, parked or social-only one)"""
+        return self.results.filter(has_website=False)
 
     def filter_by_rating(self, min_rating: float = 4.0) -> list[dict]:
         """Filter businesses by minimum rating"""
-        return [b for b in self.businesses if (b.get('rating') or 0) >= min_rating]
+        return self.results.filter(min_rating=min_rating)
 
     def save_results(self, filename: Optional[str] = None) -> str:
         """Save results to JSON"""
@@ -238,24 +489,39 @@ class GoogleMapsScraper:
             logger.warning("pandas not installed. Skipping CSV export.")
             return None
 
+    def save_sqlite(self, filename: str = "leads.sqlite") -> str:
+        """
+        Upsert results into a SQLite lead database with full-text search.
+
+        Repeated calls with the same file merge into one database.
+        """
+        filepath = self.output_dir / filename
+        with LeadDatabase(str(filepath)) as db:
+            db.add(self.businesses)
+            total = db.count()
+
+        logger.info(f"Saved {len(self.businesses)} businesses to {filepath} ({total} total)")
+        return str(filepath)
+
     def print_summary(self):
         """Print summary of scraped businesses"""
-        no_website = self.filter_no_website()
+        no_website_count = self.results.count(has_website=False)
 
         print("\n" + "="*80)
         print(f"SCRAPING SUMMARY - {len(self.businesses)} businesses found")
-        print(f"Businesses WITHOUT websites: {len(no_website)} ✅")
+        print(f"Businesses WITHOUT websites: {no_website_count} ✅")
         print("="*80)
 
-        for i, biz in enumerate(no_website[:10], 1):  # Show first 10
+        # Show first 10
+        for i, biz in enumerate(self.results.filter(has_website=False)[:10], 1):
             print(f"\n{i}. {biz.get('name', 'Unknown')}")
             print(
                 f"   Rating: {biz.get('rating', 'N/A')} ⭐ ({biz.get('review_count', 0)} reviews)")
             print(f"   Address: {biz.get('address', 'N/A')}")
             print(f"   Phone: {biz.get('phone', 'N/A')}")
 
-        if len(no_website) > 10:
-            print(f"\n... and {len(no_website) - 10} more businesses")
+        if no_website_count > 10:
+            print(f"\n... and {no_website_count - 10} more businesses")
 
         print("\n" + "="*80)
 
@@ -287,4 +553,6 @@ async def main():
 
 
 if __name__ == "__main__":
+    # Configure logging (queued, so log I/O stays off the scraping loop)
+    setup_logging()
     asyncio.run(main())
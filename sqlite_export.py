@@ -0,0 +1,237 @@
+"""
+SQLite lead database for scraped businesses
+Writes results incrementally in batched transactions into an indexed table
+with full-text search over name and address; records are upserted by their
+stable key so repeated runs merge into one growing database
+"""
+
+import json
+import logging
+import re
+import sqlite3
+from datetime import datetime
+from typing import Iterable, Optional
+
+from delta import CHANGE_GONE, record_key
+from result_store import city_of
+from website_check import has_real_website
+
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ['key', 'place_id', 'name', 'address', 'phone', 'website', 'rating',
+           'review_count', 'has_website', 'city', 'category', 'query', 'place_url',
+           'data', 'first_seen', 'last_seen']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS businesses (
+    key TEXT PRIMARY KEY,
+    place_id TEXT,
+    name TEXT,
+    address TEXT,
+    phone TEXT,
+    website TEXT,
+    rating REAL,
+    review_count INTEGER,
+    has_website INTEGER NOT NULL,
+    city TEXT COLLATE NOCASE,
+    category TEXT,
+    query TEXT,
+    place_url TEXT,
+    data TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_businesses_rating ON businesses (rating);
+CREATE INDEX IF NOT EXISTS idx_businesses_review_count ON businesses (review_count);
+CREATE INDEX IF NOT EXISTS idx_businesses_has_website ON businesses (has_website, rating);
+CREATE INDEX IF NOT EXISTS idx_businesses_city ON businesses (city);
+"""
+
+# External-content FTS table: the text lives once, in businesses, and the
+# triggers keep the index in step with inserts, upserts and deletes
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS businesses_fts USING fts5(
+    name, address, content='businesses', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS businesses_fts_insert AFTER INSERT ON businesses BEGIN
+    INSERT INTO businesses_fts (rowid, name, address) VALUES (new.rowid, new.name, new.address);
+END;
+CREATE TRIGGER IF NOT EXISTS businesses_fts_delete AFTER DELETE ON businesses BEGIN
+    INSERT INTO businesses_fts (businesses_fts, rowid, name, address)
+    VALUES ('delete', old.rowid, old.name, old.address);
+END;
+CREATE TRIGGER IF NOT EXISTS businesses_fts_update AFTER UPDATE OF name, address ON businesses BEGIN
+    INSERT INTO businesses_fts (businesses_fts, rowid, name, address)
+    VALUES ('delete', old.rowid, old.name, old.address);
+    INSERT INTO businesses_fts (rowid, name, address) VALUES (new.rowid, new.name, new.address);
+END;
+"""
+
+# The newest scrape wins, except that first_seen is kept and a field the
+# newest scrape didn't get (NULL) keeps its stored value; the full record in
+# data is merged the same way, so search returns what the columns hold
+UPSERT = f"""
+INSERT INTO businesses ({', '.join(COLUMNS)})
+VALUES ({', '.join('?' for _ in COLUMNS)})
+ON CONFLICT (key) DO UPDATE SET
+{', '.join(f'{c} = COALESCE(excluded.{c}, {c})' for c in COLUMNS if c not in ('key', 'data', 'first_seen'))},
+data = json_patch(data, excluded.data)
+"""
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query: every word must match as a prefix"""
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+class LeadDatabase:
+    """
+    Incrementally written SQLite database of businesses.
+
+    Usage:
+        with LeadDatabase('./output/leads.sqlite') as db:
+            db.add(businesses)
+            db.search('joe plumb brooklyn', has_website=False)
+    """
+
+    def __init__(self, path: str, batch_size: int = 500):
+        """
+        Open (or create) the database.
+
+        Args:
+            path: SQLite file
+            batch_size: Buffered records written per transaction
+        """
+        self.path = path
+        self.batch_size = batch_size
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(SCHEMA)
+        try:
+            self.conn.executescript(FTS_SCHEMA)
+            self.fts = True
+        except sqlite3.OperationalError as e:
+            logger.warning(f"SQLite without FTS5 ({e}); search falls back to LIKE")
+            self.fts = False
+        self.pending = []
+        self.stats = {'written': 0, 'batches': 0}
+
+    def __enter__(self) -> 'LeadDatabase':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _row(self, business: dict, now: str) -> tuple:
+        values = {
+            'key': record_key(business),
+            'place_id': business.get('place_id'),
+            'name': business.get('name'),
+            'address': business.get('address'),
+            'phone': business.get('phone_e164') or business.get('phone'),
+            'website': business.get('website'),
+            'rating': business.get('rating'),
+            'review_count': business.get('review_count'),
+            'has_website': int(has_real_website(business)),
+            'city': city_of(business),
+            'category': business.get('category'),
+            'query': business.get('query'),
+            'place_url': business.get('place_url'),
+            # Missing fields are left out, so merging keeps their stored values
+            'data': json.dumps({field: value for field, value in business.items()
+                                if value is not None}, ensure_ascii=False, default=str),
+            'first_seen': now,
+            'last_seen': now,
+        }
+        return tuple(values[column] for column in COLUMNS)
+
+    def add(self, businesses: Iterable[dict]):
+        """Buffer businesses, writing a transaction every batch_size records"""
+        for business in businesses:
+            # Delta-mode "gone" records only carry last known values
+            if business.get('change_type') == CHANGE_GONE:
+                continue
+            self.pending.append(business)
+            if len(self.pending) >= self.batch_size:
+                self.flush()
+
+    def flush(self):
+        """Write buffered businesses in one transaction"""
+        if not self.pending:
+            return
+        now = datetime.now().isoformat()
+        rows = [self._row(business, now) for business in self.pending]
+        with self.conn:
+            self.conn.executemany(UPSERT, rows)
+        self.stats['written'] += len(rows)
+        self.stats['batches'] += 1
+        self.pending = []
+
+    def count(self) -> int:
+        self.flush()
+        return self.conn.execute('SELECT COUNT(*) FROM businesses').fetchone()[0]
+
+    def search(self, text: Optional[str] = None, has_website: Optional[bool] = None,
+               min_rating: Optional[float] = None, min_reviews: Optional[int] = None,
+               city: Optional[str] = None, limit: int = 50) -> list[dict]:
+        """
+        Find businesses by name/address words plus optional filters.
+
+        Args:
+            text: Words to match in name or address, as prefixes
+                ("joe plumb brooklyn")
+            has_website: True/False to require or exclude a real website
+            min_rating: Minimum rating
+            min_reviews: Minimum review count
+            city: Exact city (case-insensitive)
+            limit: Maximum rows
+
+        Returns:
+            Matching businesses (best text match first, else highest rated)
+        """
+        self.flush()
+        clauses, params, order = [], [], 'b.rating DESC'
+        source = 'businesses b'
+        # Text without words (e.g. "&") matches everything, as if not given;
+        # an empty MATCH would be an FTS5 syntax error
+        match = fts_query(text) if text else ''
+        if match and self.fts:
+            source = 'businesses_fts f JOIN businesses b ON b.rowid = f.rowid'
+            clauses.append('businesses_fts MATCH ?')
+            params.append(match)
+            order = 'bm25(businesses_fts)'
+        elif text:
+            for word in re.findall(r'\w+', text):
+                clauses.append("(b.name LIKE ? OR b.address LIKE ?)")
+                params.extend([f"%{word}%"] * 2)
+        if has_website is not None:
+            clauses.append('b.has_website = ?')
+            params.append(int(has_website))
+        if min_rating is not None:
+            clauses.append('b.rating >= ?')
+            params.append(min_rating)
+        if min_reviews is not None:
+            clauses.append('b.review_count >= ?')
+            params.append(min_reviews)
+        if city:
+            clauses.append('b.city = ?')
+            params.append(city)
+
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ''
+        sql = f"SELECT b.data FROM {source} {where} ORDER BY {order} LIMIT ?"
+        return [json.loads(row['data']) for row in self.conn.execute(sql, [*params, limit])]
+
+    def close(self):
+        """Write what's buffered and fold the WAL back into the database file"""
+        if self.conn is None:
+            return
+        self.flush()
+        self.conn.commit()
+        self.conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        self.conn.close()
+        self.conn = None
@@ -0,0 +1,129 @@
+"""
+Streaming extraction with a slow consumer: a request retried after a handler
+timeout must not emit the records its earlier attempt already delivered
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip('crawlee')
+
+from scraper import GoogleMapsScraper  # noqa: E402
+
+
+LISTINGS = 20
+
+
+class FakeLocator:
+    def __init__(self, items):
+        self.items = items
+
+    async def all(self):
+        return self.items
+
+
+class FakePage:
+    async def wait_for_load_state(self, *args, **kwargs):
+        pass
+
+    def locator(self, selector):
+        return FakeLocator(list(range(LISTINGS)))
+
+
+async def fake_extract(element, page):
+    return {'name': f"Business {element}", 'address': f"{element} Main St", 'website': None}
+
+
+def make_scraper(tmp_path, handler_timeout, max_retries=10):
+    """Scraper whose crawl runs one request like Crawlee: timeout, then retry"""
+    scraper = GoogleMapsScraper(["plumbers in Austin"], output_dir=str(tmp_path))
+    scraper._extract_business_data = fake_extract
+    context = SimpleNamespace(page=FakePage(),
+                              request=SimpleNamespace(unique_key='search',
+                                                      user_data={'query': 'plumbers in Austin'}))
+    attempts = []
+
+    async def crawl(emit, concurrency):
+        emitted = set()
+        for _ in range(max_retries + 1):
+            attempts.append(1)
+            try:
+                await asyncio.wait_for(
+                    scraper._handle_page(context, emit, concurrency, emitted), handler_timeout)
+                return
+            except asyncio.TimeoutError:
+                continue
+
+    scraper._crawl = crawl
+    return scraper, attempts
+
+
+def test_slow_consumer_retries_do_not_duplicate(tmp_path):
+    scraper, attempts = make_scraper(tmp_path, handler_timeout=0.05)
+
+    async def consume():
+        names = []
+        async for business in scraper.iter_businesses(max_buffered=2, concurrency=4):
+            await asyncio.sleep(0.01)  # Slower than extraction
+            names.append(business['name'])
+        return names
+
+    names = asyncio.run(consume())
+
+    assert len(attempts) > 1, "the handler should have timed out at least once"
+    assert sorted(names) == sorted(f"Business {i}" for i in range(LISTINGS))
+
+
+def test_fast_consumer_single_attempt(tmp_path):
+    scraper, attempts = make_scraper(tmp_path, handler_timeout=5)
+
+    async def consume():
+        return [business async for business in scraper.iter_businesses(max_buffered=2)]
+
+    businesses = asyncio.run(consume())
+
+    assert len(attempts) == 1
+    assert len(businesses) == LISTINGS
+    assert all(business['query'] == 'plumbers in Austin' for business in businesses)
+
+
+def test_consumer_stopping_early_with_full_buffer(tmp_path):
+    scraper, _ = make_scraper(tmp_path, handler_timeout=5)
+
+    async def consume():
+        stream = scraper.iter_businesses(max_buffered=5)
+        names = []
+        async for business in stream:
+            names.append(business['name'])
+            if len(names) == 3:
+                break
+        # Let the producer fill the buffer before the stream is closed
+        await asyncio.sleep(0.05)
+        started = time.monotonic()
+        await asyncio.wait_for(stream.aclose(), 2)
+        return names, time.monotonic() - started
+
+    names, closing = asyncio.run(consume())
+    assert len(names) == 3
+    assert closing < 1, "closing the stream should cancel the crawl at once"
+
+
+def test_identical_cards_are_all_emitted(tmp_path):
+    scraper, _ = make_scraper(tmp_path, handler_timeout=0.05)
+
+    async def same_card(element, page):
+        return {'name': "Starbucks", 'address': None, 'website': None}
+
+    scraper._extract_business_data = same_card
+
+    async def consume():
+        businesses = []
+        async for business in scraper.iter_businesses(max_buffered=2, concurrency=4):
+            await asyncio.sleep(0.01)
+            businesses.append(business)
+        return businesses
+
+    assert len(asyncio.run(consume())) == LISTINGS
@@ -0,0 +1,296 @@
+"""
+Website liveness checks for scraped businesses
+Verifies listed websites concurrently over a pooled HTTP client and
+classifies each one as live, dead, parked or social-only, since a lead whose
+"website" is a dead domain or a Facebook page has no real website
+"""
+
+import asyncio
+import logging
+from collections import Counter
+from typing import Iterable, Optional
+from urllib.parse import urljoin, urlsplit
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+
+logger = logging.getLogger(__name__)
+
+STATUS_LIVE = 'live'
+STATUS_DEAD = 'dead'
+STATUS_PARKED = 'parked'
+STATUS_SOCIAL = 'social'
+STATUS_UNKNOWN = 'unknown'
+
+# Statuses that mean the business has no website of its own
+NOT_A_WEBSITE = {STATUS_DEAD, STATUS_PARKED, STATUS_SOCIAL}
+
+SOCIAL_HOSTS = {
+    'facebook.com', 'fb.com', 'fb.me', 'instagram.com', 'twitter.com', 'x.com',
+    'linkedin.com', 'tiktok.com', 'youtube.com', 'pinterest.com', 'yelp.com',
+    'nextdoor.com', 'linktr.ee', 'wa.me', 'm.me', 'sites.google.com',
+}
+
+PARKING_HOSTS = {
+    'sedoparking.com', 'sedo.com', 'parkingcrew.net', 'bodis.com', 'above.com',
+    'dan.com', 'afternic.com', 'hugedomains.com', 'undeveloped.com',
+    'parklogic.com', 'domainmarket.com', 'buydomains.com', 'brandbucket.com',
+}
+
+# Phrases of registrar and parking placeholder pages (matched lowercased)
+PARKED_MARKERS = (
+    'this domain is for sale', 'this domain may be for sale', 'buy this domain',
+    'domain is parked', 'parked free, courtesy of', 'domain has expired',
+    'this domain name has expired', 'parkingcrew', 'sedoparking',
+    'is available for purchase', 'future home of something quite cool',
+)
+
+# Servers that answer HEAD with these usually just don't implement it
+HEAD_UNSUPPORTED = {400, 403, 404, 405, 406, 429, 500, 501, 502, 503}
+
+MAX_REDIRECTS = 5
+# Parking markers sit near the top of the page; don't download whole sites
+SNIFF_BYTES = 16 * 1024
+
+
+def normalize_url(url: Optional[str]) -> Optional[str]:
+    """Add a scheme to bare domains ("joesplumbing.com"); None if it isn't a web URL"""
+    if not url:
+        return None
+    url = url.strip()
+    if '://' not in url:
+        url = f"http://{url}"
+    parts = urlsplit(url)
+    if parts.scheme not in ('http', 'https') or not parts.hostname:
+        return None
+    return url
+
+
+def _matches(host: str, hosts: set[str]) -> bool:
+    """Whether a host is one of `hosts` or a subdomain of one"""
+    host = host.lower().rstrip('.')
+    if host.startswith('www.'):
+        host = host[4:]
+    return host in hosts or any(host.endswith(f".{h}") for h in hosts)
+
+
+def host_status(url: str) -> Optional[str]:
+    """"social" or "parked" when the URL's host alone settles it"""
+    host = urlsplit(url).hostname or ''
+    if _matches(host, SOCIAL_HOSTS):
+        return STATUS_SOCIAL
+    if _matches(host, PARKING_HOSTS):
+        return STATUS_PARKED
+    return None
+
+
+def has_real_website(business: dict) -> bool:
+    """A website is listed and wasn't found dead, parked or social-only"""
+    return bool(business.get('website')) and business.get('website_status') not in NOT_A_WEBSITE
+
+
+class WebsiteChecker:
+    """
+    Concurrent website liveness checker over one pooled aiohttp session.
+
+    Each URL gets a HEAD request (redirects followed by hand, so a redirect
+    to a social or parking host is classified without fetching it), then a
+    GET that reads only the first few KB: as a fallback when HEAD is
+    refused, or to look for parking-page markers. DNS lookups are cached
+    by the connector, and concurrency is capped both overall and per host.
+
+    Usage:
+        async with WebsiteChecker() as checker:
+            stats = await checker.verify(businesses)
+    """
+
+    def __init__(self, concurrency: int = 200, per_host: int = 4,
+                 timeout: float = 8, connect_timeout: float = 4,
+                 dns_cache_secs: int = 600, sniff_parked: bool = True,
+                 user_agent: Optional[str] = None):
+        """
+        Initialize the checker.
+
+        Args:
+            concurrency: Maximum URLs checked at once
+            per_host: Maximum URLs checked at once on the same host
+            timeout: Seconds allowed per request
+            connect_timeout: Seconds allowed to connect
+            dns_cache_secs: How long resolved hosts are reused
+            sniff_parked: GET live pages to detect parking placeholders
+            user_agent: User-Agent header (a desktop browser by default)
+        """
+        if aiohttp is None:
+            raise RuntimeError("Website checks need aiohttp (pip install aiohttp)")
+        self.concurrency = concurrency
+        self.per_host = per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout, sock_connect=connect_timeout)
+        self.dns_cache_secs = dns_cache_secs
+        self.sniff_parked = sniff_parked
+        self.headers = {
+            'User-Agent': user_agent or (
+                'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+                '(KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'),
+            'Accept': 'text/html,application/xhtml+xml,*/*;q=0.8',
+        }
+        self.session = None
+        self._slots = None
+        self._host_slots = {}
+        self._checks = {}
+        self.stats = Counter()
+
+    async def __aenter__(self) -> 'WebsiteChecker':
+        connector = aiohttp.TCPConnector(
+            limit=self.concurrency,
+            limit_per_host=self.per_host,
+            ttl_dns_cache=self.dns_cache_secs,
+            # Liveness, not trust: a bad certificate still means a live site
+            ssl=False,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector, timeout=self.timeout, headers=self.headers)
+        self._slots = asyncio.Semaphore(self.concurrency)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+        self.session = None
+
+    async def _request(self, method: str, url: str, sniff: bool) -> dict:
+        """One request with redirects followed by hand; reads up to SNIFF_BYTES if asked"""
+        for _ in range(MAX_REDIRECTS + 1):
+            async with self.session.request(method, url, allow_redirects=False) as response:
+                location = response.headers.get('Location')
+                if 300 <= response.status < 400 and location:
+                    url = urljoin(url, location)
+                    status = host_status(url)
+                    if status:
+                        return {'final_url': url, 'http_status': response.status,
+                                'host_status': status, 'body': ''}
+                    continue
+
+                body = ''
+                content_type = response.headers.get('Content-Type', '')
+                if sniff and (not content_type or 'html' in content_type):
+                    chunks, size = [], 0
+                    while size < SNIFF_BYTES:
+                        chunk = await response.content.read(SNIFF_BYTES - size)
+                        if not chunk:
+                            break
+                        chunks.append(chunk)
+                        size += len(chunk)
+                    body = b''.join(chunks).decode('utf-8', 'ignore')
+                return {'final_url': url, 'http_status': response.status,
+                        'host_status': None, 'body': body}
+
+        return {'final_url': url, 'http_status': None, 'host_status': STATUS_DEAD,
+                'body': '', 'reason': 'too many redirects'}
+
+    async def _probe(self, url: str) -> dict:
+        """HEAD, then GET as a fallback or to sniff for a parking page"""
+        try:
+            outcome = await self._request('HEAD', url, sniff=False)
+        except (asyncio.TimeoutError, aiohttp.ClientConnectorError):
+            raise  # GET can't help with an unreachable host
+        except aiohttp.ClientError:
+            outcome = None  # Some servers drop HEAD requests
+        self.stats['head'] += 1
+
+        if outcome and outcome['host_status']:
+            return outcome
+        if outcome is None or outcome['http_status'] in HEAD_UNSUPPORTED:
+            self.stats['get_fallback'] += 1
+            return await self._request('GET', url, sniff=True)
+        if self.sniff_parked and outcome['http_status'] < 300:
+            self.stats['get_sniff'] += 1
+            return await self._request('GET', outcome['final_url'], sniff=True)
+        return outcome
+
+    async def _check(self, url: str) -> dict:
+        result = {'url': url, 'final_url': url, 'http_status': None}
+        status = host_status(url)
+        if status:
+            return {**result, 'status': status, 'reason': 'social or parking host'}
+
+        host = urlsplit(url).hostname
+        host_slot = self._host_slots.setdefault(host, asyncio.Semaphore(self.per_host))
+        # Wait for the host slot first so queued same-host URLs don't hold
+        # global slots, and so waiting doesn't eat into request timeouts
+        async with host_slot, self._slots:
+            try:
+                outcome = await self._probe(url)
+            except asyncio.TimeoutError:
+                return {**result, 'status': STATUS_DEAD, 'reason': 'timeout'}
+            except aiohttp.ClientConnectorError as e:
+                return {**result, 'status': STATUS_DEAD, 'reason': f"unreachable: {e.os_error or e}"}
+            except (aiohttp.ClientError, ValueError) as e:
+                return {**result, 'status': STATUS_DEAD, 'reason': type(e).__name__}
+
+        result.update(final_url=outcome['final_url'], http_status=outcome['http_status'])
+        if outcome['host_status']:
+            return {**result, 'status': outcome['host_status'],
+                    'reason': outcome.get('reason', 'redirects to social or parking host')}
+
+        code = outcome['http_status']
+        body = outcome['body'].lower()
+        if code in (401, 403, 429):
+            # Bot protection or a login wall: something is served there
+            return {**result, 'status': STATUS_LIVE, 'reason': f"HTTP {code} (blocked)"}
+        if code >= 400:
+            return {**result, 'status': STATUS_DEAD, 'reason': f"HTTP {code}"}
+        if any(marker in body for marker in PARKED_MARKERS):
+            return {**result, 'status': STATUS_PARKED, 'reason': 'parking page'}
+        if code >= 300:
+            return {**result, 'status': STATUS_UNKNOWN, 'reason': f"HTTP {code} without location"}
+        return {**result, 'status': STATUS_LIVE, 'reason': f"HTTP {code}"}
+
+    async def check(self, url: str) -> dict:
+        """
+        Classify one website.
+
+        The same URL is checked once per checker, however many businesses
+        list it (chains often share one site).
+
+        Returns:
+            Dict with url, status (live/dead/parked/social/unknown), reason,
+            final_url and http_status
+        """
+        normalized = normalize_url(url)
+        if normalized is None:
+            return {'url': url, 'final_url': url, 'http_status': None,
+                    'status': STATUS_DEAD, 'reason': 'not a web URL'}
+        if normalized not in self._checks:
+            self._checks[normalized] = asyncio.ensure_future(self._check(normalized))
+        return await self._checks[normalized]
+
+    async def check_many(self, urls: Iterable[str]) -> dict[str, dict]:
+        """Classify many websites concurrently, keyed by the given URL"""
+        urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(*(self.check(url) for url in urls))
+        return dict(zip(urls, results))
+
+    async def verify(self, businesses: list[dict]) -> dict:
+        """
+        Check every listed website and annotate the businesses in place with
+        website_status and website_final_url.
+
+        Returns:
+            Counts per status
+        """
+        listed = [b for b in businesses if b.get('website')]
+        results = await self.check_many(b['website'] for b in listed)
+
+        counts = Counter()
+        for business in listed:
+            result = results[business['website']]
+            business['website_status'] = result['status']
+            business['website_final_url'] = result['final_url']
+            counts[result['status']] += 1
+            logger.debug(f"{business['website']}: {result['status']} ({result['reason']})")
+
+        logger.info(f"Checked {len(results)} websites of {len(listed)} businesses: "
+                    + ', '.join(f"{count} {status}" for status, count in counts.most_common()))
+        return dict(counts)
@@ -0,0 +1,446 @@
+"""
+Multi-process worker sharding for the Google Maps Scraper
+N worker processes, each with its own browser, pull queries from a shared
+durable queue (SQLite locally, or the Apify request queue) and stream
+businesses back to a single deduplicating writer
+"""
+
+import asyncio
+import json
+import logging
+import multiprocessing
+import queue as queue_module
+import sqlite3
+import threading
+import time
+from urllib.parse import quote_plus
+from typing import AsyncIterator, Callable, Optional
+
+from delta import record_key
+from progress import setup_logging
+
+
+logger = logging.getLogger(__name__)
+
+# Messages sent from workers to the writer over the result queue
+MSG_RECORDS = 'records'
+MSG_DONE = 'done'
+
+
+class SQLiteTaskQueue:
+    """
+    Durable task queue in a SQLite file with lease-based crash recovery.
+
+    A worker leases a task for `lease_seconds` and renews the lease while
+    it works on the task; if it crashes, the lease expires and another
+    worker picks the task up again. Tasks that fail `max_attempts` times
+    are marked failed. The blocking SQLite calls run in a thread, one at a
+    time, so they never stall the worker's event loop.
+    """
+
+    def __init__(self, path: str, lease_seconds: int = 180, max_attempts: int = 3):
+        """
+        Initialize the queue (creates the table if needed).
+
+        Args:
+            path: SQLite database file shared by all workers
+            lease_seconds: How long a leased task stays invisible to others
+            max_attempts: Leases per task before it is marked failed
+        """
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None,
+                                    check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY,
+                unique_key TEXT UNIQUE,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                lease_until REAL,
+                worker TEXT
+            )
+        """)
+
+    async def _run(self, function: Callable, *args):
+        """Run a blocking call on the shared connection in a thread"""
+        def locked():
+            with self._lock:
+                return function(*args)
+        return await asyncio.to_thread(locked)
+
+    async def push(self, tasks: list[dict]):
+        """Add tasks; tasks with a unique_key already in the queue are skipped"""
+        await self._run(
+            self.conn.executemany,
+            'INSERT OR IGNORE INTO tasks (unique_key, payload) VALUES (?, ?)',
+            [(task_key(t), json.dumps(t)) for t in tasks])
+
+    async def lease(self, worker: str) -> Optional[tuple[int, dict]]:
+        """Claim the next pending or expired task, or None if there is none right now"""
+        return await self._run(self._lease, worker)
+
+    def _lease(self, worker: str) -> Optional[tuple[int, dict]]:
+        now = time.time()
+        self.conn.execute('BEGIN IMMEDIATE')
+        try:
+            # Expired leases that used up their attempts are given up on
+            self.conn.execute(
+                "UPDATE tasks SET status = 'failed' WHERE status = 'leased' "
+                'AND lease_until < ? AND attempts >= ?', (now, self.max_attempts))
+            row = self.conn.execute(
+                "SELECT id, payload FROM tasks WHERE status = 'pending' "
+                "OR (status = 'leased' AND lease_until < ?) ORDER BY id LIMIT 1",
+                (now,)).fetchone()
+            if row is None:
+                self.conn.execute('COMMIT')
+                return None
+            self.conn.execute(
+                "UPDATE tasks SET status = 'leased', attempts = attempts + 1, "
+                'lease_until = ?, worker = ? WHERE id = ?',
+                (now + self.lease_seconds, worker, row[0]))
+            self.conn.execute('COMMIT')
+        except Exception:
+            self.conn.execute('ROLLBACK')
+            raise
+        return row[0], json.loads(row[1])
+
+    async def renew(self, handle: int):
+        """Extend the lease of a task that is still being worked on"""
+        await self._run(
+            self.conn.execute,
+            "UPDATE tasks SET lease_until = ? WHERE id = ? AND status = 'leased'",
+            (time.time() + self.lease_seconds, handle))
+
+    async def complete(self, handle: int):
+        """Mark a leased task as done"""
+        await self._run(
+            self.conn.execute,
+            "UPDATE tasks SET status = 'done', lease_until = NULL WHERE id = ?", (handle,))
+
+    async def release(self, handle: int):
+        """Give a task back after an error (failed once it used up its attempts)"""
+        await self._run(
+            self.conn.execute,
+            "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            'lease_until = NULL WHERE id = ?', (self.max_attempts, handle))
+
+    async def is_finished(self) -> bool:
+        """True when no task is pending or leased"""
+        return await self.unfinished() == 0
+
+    async def unfinished(self) -> int:
+        """Number of pending or leased tasks"""
+        def count():
+            return self.conn.execute(
+                "SELECT COUNT(*) FROM tasks WHERE status IN ('pending', 'leased')").fetchone()[0]
+        return await self._run(count)
+
+    def clear(self):
+        """Drop all tasks (start a fresh run instead of resuming)"""
+        self.conn.execute('DELETE FROM tasks')
+
+    def counts(self) -> dict:
+        """Number of tasks per status"""
+        return dict(self.conn.execute(
+            'SELECT status, COUNT(*) FROM tasks GROUP BY status').fetchall())
+
+    def close(self):
+        self.conn.close()
+
+
+class ApifyTaskQueue:
+    """
+    Task queue backed by a named Apify request queue.
+
+    The platform locks fetched requests, which gives the same lease-based
+    recovery as SQLiteTaskQueue across processes and Actor migrations.
+    """
+
+    def __init__(self, request_queue):
+        self.request_queue = request_queue
+
+    @classmethod
+    async def open(cls, name: Optional[str] = None) -> 'ApifyTaskQueue':
+        """Open a named queue, or the run's default queue (kept across migrations)"""
+        from apify import Actor
+        return cls(await Actor.open_request_queue(name=name))
+
+    async def push(self, tasks: list[dict]):
+        from crawlee import Request
+        for task in tasks:
+            url = f"https://www.google.com/maps/search/{quote_plus(task['query'])}"
+            await self.request_queue.add_request(Request.from_url(
+                url, unique_key=task_key(task), user_data={'task': task}))
+
+    async def lease(self, worker: str) -> Optional[tuple[object, dict]]:
+        request = await self.request_queue.fetch_next_request()
+        if request is None:
+            return None
+        return request, dict(request.user_data['task'])
+
+    async def renew(self, handle):
+        # No lease to extend here: the request queue client handles the
+        # locks of the requests it fetched
+        pass
+
+    async def complete(self, handle):
+        await self.request_queue.mark_request_as_handled(handle)
+
+    async def release(self, handle):
+        await self.request_queue.reclaim_request(handle)
+
+    async def is_finished(self) -> bool:
+        return await self.request_queue.is_finished()
+
+    async def unfinished(self) -> int:
+        return (await self.request_queue.get_total_count()
+                - await self.request_queue.get_handled_count())
+
+    def close(self):
+        pass
+
+
+def task_key(task: dict) -> str:
+    """Unique key of a task, so re-pushing the same query is a no-op"""
+    return f"{task.get('kind', 'query')}:{task['query'].strip().lower()}:{task.get('max_results')}"
+
+
+async def open_task_queue(backend: str, location: Optional[str]):
+    """Open the shared queue: backend 'sqlite' (file path) or 'apify' (queue name)"""
+    if backend == 'sqlite':
+        return SQLiteTaskQueue(location)
+    if backend == 'apify':
+        return await ApifyTaskQueue.open(location)
+    raise ValueError(f"Unknown queue backend '{backend}' (use 'sqlite' or 'apify')")
+
+
+async def _renew_lease(task_queue, handle, interval: Optional[float] = None):
+    """Keep renewing a task's lease until cancelled"""
+    interval = interval or getattr(task_queue, 'lease_seconds', 180) / 3
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await task_queue.renew(handle)
+        except Exception as e:
+            logger.warning(f"Couldn't renew lease: {e}")
+
+
+async def _run_worker(worker_id: str, backend: str, location: str, results,
+                      options: dict):
+    from scraper_simple import GoogleMapsScraper
+    from memory_watchdog import MemoryWatchdog
+
+    task_queue = await open_task_queue(backend, location)
+    watchdog = MemoryWatchdog(limit_mb=options.get('memory_mb'),
+                              max_navigations=options.get('max_navigations', 20))
+    # Failed queries raise, so their task is released and retried
+    scraper = GoogleMapsScraper(output_dir=options.get('output_dir', './output'),
+                                watchdog=watchdog,
+                                launch_profile=options.get('launch_profile', 'lean'),
+                                raise_errors=True)
+    processed = 0
+
+    async with scraper.browser_session():
+        while True:
+            leased = await task_queue.lease(worker_id)
+            if leased is None:
+                if await task_queue.is_finished():
+                    break
+                # Other workers still hold leases; wait in case one expires
+                await asyncio.sleep(options.get('poll_interval', 2))
+                continue
+
+            handle, task = leased
+            heartbeat = asyncio.create_task(_renew_lease(task_queue, handle))
+            try:
+                businesses = await scraper.scrape_query(
+                    task['query'], task.get('max_results', 20))
+            except Exception as e:
+                logger.error(f"[{worker_id}] Task {task['query']!r} failed: {e}")
+                await task_queue.release(handle)
+                continue
+            finally:
+                heartbeat.cancel()
+
+            # The scraper's own list isn't needed; records go to the writer
+            scraper.businesses.clear()
+            results.put((MSG_RECORDS, worker_id, businesses))
+            await task_queue.complete(handle)
+            processed += 1
+            await asyncio.sleep(options.get('delay', 2))  # Be respectful with timing
+
+    task_queue.close()
+    logger.info(f"[{worker_id}] Finished after {processed} tasks")
+
+
+def worker_main(worker_id: str, backend: str, location: str, results, options: dict):
+    """Entry point of a worker process"""
+    setup_logging()
+    try:
+        if backend == 'apify':
+            from apify import Actor
+
+            async def run():
+                async with Actor:
+                    await _run_worker(worker_id, backend, location, results, options)
+            asyncio.run(run())
+        else:
+            asyncio.run(_run_worker(worker_id, backend, location, results, options))
+    finally:
+        results.put((MSG_DONE, worker_id, None))
+
+
+class ShardedScrape:
+    """
+    Runs queries across worker processes and deduplicates their output.
+
+    Usage:
+        sharded = ShardedScrape(workers=4, location='./output/queue.sqlite')
+        async for business in sharded.stream(queries, max_results=20):
+            ...
+    """
+
+    def __init__(self, workers: int, backend: str = 'sqlite',
+                 location: Optional[str] = './output/queue.sqlite',
+                 options: Optional[dict] = None, resume: bool = False,
+                 max_restarts: int = 5):
+        """
+        Initialize the sharded run.
+
+        Args:
+            workers: Number of worker processes (each runs its own browser)
+            backend: 'sqlite' or 'apify'
+            location: SQLite file path, or Apify request queue name (None:
+                the run's default queue)
+            options: Passed to workers (memory_mb, max_navigations, delay,
+                poll_interval, output_dir, launch_profile)
+            resume: Keep the tasks of an interrupted earlier run in a SQLite
+                queue instead of starting fresh
+            max_restarts: Replacement workers started in total for workers
+                that exit (e.g. crash) while tasks are still unfinished
+        """
+        self.workers = workers
+        self.backend = backend
+        self.location = location
+        self.options = options or {}
+        self.resume = resume
+        self.max_restarts = max_restarts
+        self.seen_keys = set()
+        self.stats = {'tasks': 0, 'records': 0,
+                      'duplicates': 0, 'crashed_workers': 0, 'restarted_workers': 0}
+
+    async def stream(self, queries: list[str], max_results: int = 20,
+                     on_results: Optional[Callable[[list[dict]], None]] = None
+                     ) -> AsyncIterator[dict]:
+        """
+        Enqueue the queries, start the workers and yield unique businesses
+        as workers report them.
+
+        Args:
+            queries: Search queries
+            max_results: Max results per query
+            on_results: Called with each batch of new (deduplicated) businesses
+        """
+        task_queue = await open_task_queue(self.backend, self.location)
+        if isinstance(task_queue, SQLiteTaskQueue) and not self.resume:
+            task_queue.clear()
+        tasks = [{'kind': 'query', 'query': q, 'max_results': max_results}
+                 for q in queries]
+        await task_queue.push(tasks)
+        self.stats['tasks'] = len(tasks)
+
+        # spawn: each worker starts a clean interpreter (no inherited event loop)
+        context = multiprocessing.get_context('spawn')
+        results = context.Queue()
+        processes = {}
+        running = set()
+
+        def start_worker():
+            worker_id = f"worker-{len(processes)}"
+            process = context.Process(
+                target=worker_main, name=worker_id,
+                args=(worker_id, self.backend, self.location, results, self.options))
+            process.start()
+            processes[worker_id] = process
+            running.add(worker_id)
+
+        async def worker_exited(worker_id: str):
+            # Workers only stop on their own once every task is finished, so
+            # an exit with tasks left means it crashed or couldn't start
+            if worker_id not in running:
+                return
+            running.discard(worker_id)
+            if await task_queue.is_finished():
+                return
+            if self.stats['restarted_workers'] >= self.max_restarts:
+                logger.error(f"{worker_id} exited with tasks unfinished and all "
+                             f"{self.max_restarts} restarts are used up")
+                return
+            self.stats['restarted_workers'] += 1
+            start_worker()
+            logger.warning(f"{worker_id} exited with tasks unfinished; started a "
+                           f"replacement ({self.stats['restarted_workers']}/"
+                           f"{self.max_restarts} restarts)")
+
+        for _ in range(self.workers):
+            start_worker()
+        logger.info(f"Started {self.workers} workers over {len(tasks)} tasks")
+
+        started = time.perf_counter()
+        try:
+            while running:
+                try:
+                    kind, worker_id, payload = await asyncio.to_thread(
+                        results.get, True, 1.0)
+                except queue_module.Empty:
+                    # A worker killed hard (e.g. OOM) never sends MSG_DONE; its
+                    # lease expires and another worker retries the task
+                    for worker_id in list(running):
+                        if not processes[worker_id].is_alive():
+                            self.stats['crashed_workers'] += 1
+                            logger.warning(f"{worker_id} exited unexpectedly")
+                            await worker_exited(worker_id)
+                    continue
+
+                if kind == MSG_DONE:
+                    await worker_exited(worker_id)
+                    continue
+
+                fresh = []
+                for business in payload:
+                    key = record_key(business)
+                    if key in self.seen_keys:
+                        self.stats['duplicates'] += 1
+                        continue
+                    self.seen_keys.add(key)
+                    fresh.append(business)
+
+                self.stats['records'] += len(fresh)
+                if on_results and fresh:
+                    on_results(fresh)
+                for business in fresh:
+                    yield business
+
+            if not await task_queue.is_finished():
+                self.stats['unfinished'] = await task_queue.unfinished()
+                logger.error(f"All workers exited with {self.stats['unfinished']} "
+                             f"tasks unfinished; their results are missing")
+        finally:
+            for process in processes.values():
+                process.join(timeout=5)
+                if process.is_alive():
+                    process.terminate()
+            if isinstance(task_queue, SQLiteTaskQueue):
+                self.stats['queue'] = task_queue.counts()
+            task_queue.close()
+
+        elapsed = time.perf_counter() - started
+        self.stats['seconds'] = round(elapsed, 1)
+        logger.info(f"Sharded run finished: {self.stats['records']} businesses "
+                    f"({self.stats['duplicates']} duplicates dropped) in {elapsed:.0f}s "
+                    f"with {self.workers} workers")